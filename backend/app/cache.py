@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, Optional, Tuple
+
+from loguru import logger
+
+
+class CachedValue:
+    """Process-wide cache for one expensive payload.
+
+    Fresh values are served straight from memory. Once ``ttl`` has passed the
+    stale value is still returned while a single background task reloads it,
+    so any number of concurrent callers cost one load per interval.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float):
+        self.loader = loader
+        self.ttl = ttl
+        self.value: Any = None
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    async def _load(self) -> Any:
+        async with self._lock:
+            if not self.is_fresh:
+                self.value = await self.loader()
+                self.loaded_at = time.monotonic()
+            return self.value
+
+    async def _refresh(self):
+        try:
+            await self._load()
+        except Exception as e:
+            logger.error(f"Background cache refresh failed: {e}")
+
+    async def get(self) -> Any:
+        if self.is_fresh:
+            return self.value
+
+        if self.loaded_at is None:
+            # Nothing to serve yet: callers wait for the first load together
+            return await self._load()
+
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self.value
+
+    def invalidate(self):
+        self.loaded_at = None
+        self.value = None
+
+
+class TokenCache:
+    """Bounded LRU cache of serialized single-token responses.
+
+    Entries are keyed by ``("id", id)`` and ``("address", network, address)``
+    and hold the response body as bytes (``None`` for a cached 404). Found
+    tokens live for ``ttl`` seconds, misses for ``not_found_ttl``. Token
+    change events evict entries early; a load that raced with an eviction
+    is not stored.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60.0, not_found_ttl: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.entries: "OrderedDict[tuple, Tuple[float, Optional[bytes]]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def id_key(token_id: int) -> tuple:
+        return ("id", token_id)
+
+    @staticmethod
+    def address_key(network: str, address: str) -> tuple:
+        return ("address", network, address.lower())
+
+    def get(self, key: tuple) -> Tuple[bool, Optional[bytes]]:
+        """Return ``(found, body)``; ``(True, None)`` is a cached 404"""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def put(self, keys: Iterable[tuple], body: Optional[bytes], generation: int):
+        """Store ``body`` under ``keys`` unless an invalidation happened since ``generation``"""
+        if generation != self.generation:
+            return
+        expires_at = time.monotonic() + (self.ttl if body is not None else self.not_found_ttl)
+        for key in keys:
+            self.entries[key] = (expires_at, body)
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[tuple]):
+        self.generation += 1
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self.entries)
+        self.entries.clear()
+
+    def on_token_event(self, event: dict):
+        """Token feed listener: drop entries of every token the event touches"""
+        if event.get('type') == 'resync':
+            # Events may have been missed while the feed was down
+            self.clear()
+            return
+        keys = []
+        for token in event.get('tokens', []):
+            if token.get('id') is not None:
+                keys.append(self.id_key(token['id']))
+            if token.get('address') and token.get('network'):
+                keys.append(self.address_key(token['network'], token['address']))
+        self.invalidate(keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
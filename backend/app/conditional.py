@@ -0,0 +1,49 @@
+"""ETag validators for the polled endpoints.
+
+Token lists are versioned without running the list query: the newest token
+id plus the token and confirmation totals of the hourly rollup change on
+every insert, confirmation and reorg rollback the ingestor writes.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+
+from app.models import Token, TokenStatsHourly
+
+
+def token_version_query(network: Optional[str] = None) -> Select:
+    """``(max id, tokens, confirmed tokens)`` of the data behind a token list"""
+    query = select(
+        select(func.max(Token.id)).scalar_subquery(),
+        func.coalesce(func.sum(TokenStatsHourly.count), 0),
+        func.coalesce(func.sum(TokenStatsHourly.confirmed_count), 0)
+    )
+    if network:
+        query = query.where(TokenStatsHourly.network == network)
+    return query
+
+
+def version_etag(*parts) -> str:
+    # Weak: the same version is served gzip-encoded or not
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def body_etag(body: bytes) -> str:
+    return version_etag(hashlib.blake2b(body, digest_size=8).hexdigest())
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's ``If-None-Match`` already covers ``etag``"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip() for tag in header.split(",")}
+    # Weak comparison, as required for If-None-Match
+    return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -13,10 +13,30 @@ class Settings(BaseSettings):
     # CORS
     cors_origins: list = ["http://localhost:3000", "http://frontend:3000"]
     
+    # Database pool: total connections shared by all worker processes
+    db_max_connections: int = 30
+    web_concurrency: int = 1  # WEB_CONCURRENCY, as read by uvicorn/gunicorn
+    
     # Pagination
     default_page_size: int = 20
     max_page_size: int = 100
     
+    # Seconds /stats/summary is served from the shared cache
+    stats_cache_ttl: float = 15.0
+    
+    # Live token feed (/ws/tokens, /stream/tokens)
+    feed_queue_size: int = 100  # events buffered per client before it is dropped
+    feed_keepalive_interval: float = 15.0
+    
+    # Hot-token cache for /tokens/{id} and /tokens/address/{address}
+    token_cache_size: int = 10000
+    token_cache_ttl: float = 60.0
+    token_cache_not_found_ttl: float = 5.0
+    
+    # Response compression for JSON bodies of at least this many bytes
+    gzip_minimum_size: int = 1024
+    gzip_level: int = 6
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
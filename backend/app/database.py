@@ -1,29 +1,35 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
 
 settings = get_settings()
 
+
+def async_database_url(url: str) -> str:
+    """Point a plain postgresql:// URL at the asyncpg driver"""
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+# Split the connection budget across uvicorn/gunicorn worker processes
+pool_size = max(1, settings.db_max_connections // max(1, settings.web_concurrency))
+
 # Create async engine
-engine = create_engine(
-    settings.database_url,
+engine = create_async_engine(
+    async_database_url(settings.database_url),
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=pool_size,
+    max_overflow=0
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
 
 # Dependency for getting DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
 
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from loguru import logger
+
+# Channel the ingestor NOTIFYs on (see ingestor/notify.py)
+TOKEN_CHANNEL = "token_events"
+RESYNC_MESSAGE = json.dumps({"type": "resync", "tokens": []})
+
+
+class Subscription:
+    """One live feed client with its filters and a bounded outbox.
+
+    A client that lets ``queue_size`` events pile up is cut off instead of
+    holding memory or slowing the fan-out for everyone else; ``None`` in the
+    queue tells the endpoint to close the connection.
+    """
+
+    def __init__(self, network: Optional[str], confirmed_only: bool, queue_size: int):
+        self.network = network
+        self.confirmed_only = confirmed_only
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    @property
+    def filter_key(self) -> Tuple[Optional[str], bool]:
+        return self.network, self.confirmed_only
+
+    def offer(self, message: str) -> bool:
+        """Queue a message; returns False once the client has fallen behind"""
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            # Make room for the close marker; the client resyncs over REST
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+
+class TokenFeed:
+    """Fan token events from a single LISTEN connection out to feed clients"""
+
+    def __init__(self, dsn: str, queue_size: int = 100, reconnect_delay: float = 5.0):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.reconnect_delay = reconnect_delay
+        self.subscriptions: Set[Subscription] = set()
+        self.listeners: List[Callable[[dict], None]] = []
+        self.events_received = 0
+        self.clients_dropped = 0
+        self.connected = False
+        self.connections = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, network: Optional[str] = None, confirmed_only: bool = True) -> Subscription:
+        subscription = Subscription(network, confirmed_only, self.queue_size)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """Call ``listener`` with every decoded event, e.g. to invalidate caches"""
+        self.listeners.append(listener)
+
+    def _notify_listeners(self, event: dict):
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Token event listener {listener!r} failed: {e}")
+
+    @staticmethod
+    def _matches(token: dict, network: Optional[str], confirmed_only: bool) -> bool:
+        if network and token.get('network') != network:
+            return False
+        return not confirmed_only or bool(token.get('confirmed'))
+
+    def publish(self, payload: str):
+        """Deliver one NOTIFY payload to every subscriber whose filters match"""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed token event: {payload[:200]}")
+            return
+        self.events_received += 1
+        self._notify_listeners(event)
+
+        # Clients with the same filters share one encoded message
+        messages: Dict[Tuple[Optional[str], bool], Optional[str]] = {}
+        for subscription in list(self.subscriptions):
+            key = subscription.filter_key
+            if key not in messages:
+                tokens = [token for token in event.get('tokens', []) if self._matches(token, *key)]
+                messages[key] = json.dumps({"type": event.get('type'), "tokens": tokens}) if tokens else None
+            if messages[key] is not None:
+                self._deliver(subscription, messages[key])
+
+    def _deliver(self, subscription: Subscription, message: str):
+        if not subscription.offer(message):
+            self.clients_dropped += 1
+            self.subscriptions.discard(subscription)
+
+    def _resync(self):
+        # Events sent while the listener was down are gone; clients refetch over REST
+        self._notify_listeners(json.loads(RESYNC_MESSAGE))
+        for subscription in list(self.subscriptions):
+            self._deliver(subscription, RESYNC_MESSAGE)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.publish(payload)
+
+    async def _listen(self):
+        connection = await asyncpg.connect(self.dsn)
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            await connection.add_listener(TOKEN_CHANNEL, self._on_notify)
+            self.connected = True
+            logger.info(f"📡 Listening for token events on '{TOKEN_CHANNEL}'")
+            if self.connections:
+                self._resync()
+            self.connections += 1
+            await closed.wait()
+        finally:
+            self.connected = False
+            if not connection.is_closed():
+                await connection.close()
+
+    async def run(self):
+        """Hold the LISTEN connection open, reconnecting when it drops"""
+        while True:
+            try:
+                await self._listen()
+                logger.warning("Token event connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token event listener failed: {e}")
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        # Wake every client so its endpoint returns
+        for subscription in list(self.subscriptions):
+            subscription.overflowed = True
+            if not subscription.queue.full():
+                subscription.queue.put_nowait(None)
+        self.subscriptions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self.connected,
+            "subscribers": len(self.subscriptions),
+            "events_received": self.events_received,
+            "clients_dropped": self.clients_dropped,
+        }
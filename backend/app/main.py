@@ -1,16 +1,27 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Row, Text, bindparam, select, func, and_, desc, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Tuple
 from loguru import logger
+import orjson
 import sys
 
-from app.database import get_db, engine, Base
-from app.models import Token
-from app.schemas import TokenResponse, StatsResponse, HealthResponse
+from app.database import get_db, engine, Base, SessionLocal
+from app.models import Token, TokenRegistry, TokenStatsHourly
+from app.schemas import TokenResponse, TokenLookupRequest, StatsResponse, HealthResponse
 from app.config import get_settings
+from app.cache import CachedValue, TokenCache
+from app.pagination import decode_cursor, encode_cursor
+from app.feed import TokenFeed
+from app.serialization import encode_token, encode_tokens, select_tokens, token_dict
+from app.conditional import body_etag, is_not_modified, not_modified, token_version_query, version_etag
+from app.compression import SelectiveGZipMiddleware
 
 # Configure logger
 logger.remove()
@@ -18,13 +29,35 @@ logger.add(sys.stdout, format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <leve
 
 settings = get_settings()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Live token events from the ingestor, one LISTEN connection per process
+token_feed = TokenFeed(settings.database_url, queue_size=settings.feed_queue_size)
+
+# Serialized single-token responses, evicted by the feed's change events
+token_cache = TokenCache(
+    max_entries=settings.token_cache_size,
+    ttl=settings.token_cache_ttl,
+    not_found_ttl=settings.token_cache_not_found_ttl
+)
+token_feed.add_listener(token_cache.on_token_event)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    token_feed.start()
+    yield
+    await token_feed.stop()
+    await engine.dispose()
+
 
 app = FastAPI(
     title="RealTime Token Scanner API",
     description="API for tracking newly deployed tokens on ETH and BSC",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -34,6 +67,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
+# Compress large JSON bodies (token pages, bulk lookups)
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=settings.gzip_minimum_size,
+    compresslevel=settings.gzip_level
 )
 
 
@@ -47,11 +88,11 @@ async def root():
 
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     """Health check endpoint"""
     try:
         # Test database connection
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         db_status = "healthy"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
@@ -66,148 +107,336 @@ async def health_check(db: Session = Depends(get_db)):
 
 @app.get("/tokens/new", response_model=List[TokenResponse])
 async def get_new_tokens(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     network: Optional[str] = Query(None, regex="^(ETH|BSC)$"),
     confirmed_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header; overrides page"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get list of newly detected tokens with pagination"""
+    """Get list of newly detected tokens with pagination.
+    
+    The ``X-Next-Cursor`` response header holds the cursor of the next page;
+    passing it back as ``cursor`` costs the same at any depth, unlike ``page``.
+    Responses carry an ``ETag``; a matching ``If-None-Match`` gets a 304 for
+    the price of the version lookup.
+    """
     try:
-        query = db.query(Token)
+        version = (await db.execute(token_version_query(network))).one()
+        etag = version_etag("tokens", *version)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        
+        query = select_tokens()
         
         # Filter by network if specified
         if network:
-            query = query.filter(Token.network == network)
+            query = query.where(Token.network == network)
         
         # Filter confirmed tokens only
         if confirmed_only:
-            query = query.filter(Token.confirmed == True)
+            query = query.where(Token.confirmed == True)
+        
+        # Order by timestamp descending (newest first), id breaks ties
+        query = query.order_by(desc(Token.timestamp), desc(Token.id))
+        
+        # Pagination: keyset when a cursor is given, offset otherwise
+        if cursor:
+            try:
+                cursor_timestamp, cursor_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            query = query.where(tuple_(Token.timestamp, Token.id) < tuple_(cursor_timestamp, cursor_id))
+        else:
+            query = query.offset((page - 1) * page_size)
         
-        # Order by timestamp descending (newest first)
-        query = query.order_by(desc(Token.timestamp))
+        tokens = (await db.execute(query.limit(page_size))).all()
         
-        # Pagination
-        offset = (page - 1) * page_size
-        tokens = query.offset(offset).limit(page_size).all()
+        headers = {"ETag": etag}
+        if len(tokens) == page_size:
+            headers["X-Next-Cursor"] = encode_cursor(tokens[-1].timestamp, tokens[-1].id)
         
-        logger.info(f"Retrieved {len(tokens)} tokens (page {page}, network: {network or 'all'})")
+        logger.info(f"Retrieved {len(tokens)} tokens ({'cursor' if cursor else f'page {page}'}, network: {network or 'all'})")
         
-        return tokens
+        return Response(content=encode_tokens(tokens), media_type="application/json", headers=headers)
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
         logger.error(f"Error fetching tokens: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/tokens/{token_id}", response_model=TokenResponse)
-async def get_token_by_id(token_id: int, db: Session = Depends(get_db)):
-    """Get specific token by ID"""
-    token = db.query(Token).filter(Token.id == token_id).first()
+async def cached_token_response(key: tuple, load: Callable[[AsyncSession], Awaitable[Optional[Row]]]) -> Response:
+    """Serve a single token from the hot-token cache, loading it on a miss"""
+    found, body = token_cache.get(key)
+    if not found:
+        generation = token_cache.generation
+        # Sessions are only opened on a miss
+        async with SessionLocal() as db:
+            token = await load(db)
+        
+        keys = {key}
+        if token:
+            body = encode_token(token)
+            keys |= {token_cache.id_key(token.id), token_cache.address_key(token.network, token.address)}
+        token_cache.put(keys, body, generation)
     
-    if not token:
+    if body is None:
         raise HTTPException(status_code=404, detail="Token not found")
     
-    return token
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/tokens/{token_id}", response_model=TokenResponse)
+async def get_token_by_id(token_id: int):
+    """Get specific token by ID"""
+    async def load(db: AsyncSession) -> Optional[Row]:
+        return (await db.execute(select_tokens().where(Token.id == token_id))).first()
+    
+    return await cached_token_response(token_cache.id_key(token_id), load)
 
 
 @app.get("/tokens/address/{address}", response_model=TokenResponse)
 async def get_token_by_address(
     address: str,
-    network: str = Query(..., regex="^(ETH|BSC)$"),
-    db: Session = Depends(get_db)
+    network: str = Query(..., regex="^(ETH|BSC)$")
 ):
     """Get token by contract address and network"""
-    token = db.query(Token).filter(
-        and_(Token.address == address.lower(), Token.network == network)
-    ).first()
+    async def load(db: AsyncSession) -> Optional[Row]:
+        # The registry's timestamp prunes the scan to the token's partition
+        registered_at = select(TokenRegistry.timestamp).where(
+            TokenRegistry.address == address.lower(), TokenRegistry.network == network
+        ).scalar_subquery()
+        return (await db.execute(
+            select_tokens().where(
+                Token.address == address.lower(), Token.network == network, Token.timestamp == registered_at
+            )
+        )).first()
     
-    if not token:
-        raise HTTPException(status_code=404, detail="Token not found")
+    return await cached_token_response(token_cache.address_key(network, address), load)
+
+
+@app.post("/tokens/lookup")
+async def lookup_tokens(request: TokenLookupRequest):
+    """Resolve many (network, address) pairs with one query.
     
-    return token
+    Streams newline-delimited JSON, one ``{"network", "address", "token"}``
+    object per distinct pair; ``token`` is null for addresses that are not
+    known. Found tokens come first, as Postgres returns them.
+    """
+    pending = {(key.network, key.address.lower()) for key in request.tokens}
+    networks, addresses = zip(*pending)
+    
+    # unnest() of two arrays keeps the statement at two parameters however
+    # many pairs are sent; the registry's primary key resolves each pair to
+    # its token's partition
+    keys = func.unnest(
+        bindparam("networks", list(networks), type_=ARRAY(Text)),
+        bindparam("addresses", list(addresses), type_=ARRAY(Text))
+    ).table_valued("network", "address").render_derived(name="keys")
+    query = (
+        select_tokens()
+        .join(TokenRegistry, and_(
+            Token.address == TokenRegistry.address,
+            Token.network == TokenRegistry.network,
+            Token.timestamp == TokenRegistry.timestamp
+        ))
+        .join(keys, and_(TokenRegistry.address == keys.c.address, TokenRegistry.network == keys.c.network))
+        .execution_options(yield_per=500)
+    )
+    
+    async def results():
+        found = 0
+        # The request's session would be closed before the body is streamed
+        async with SessionLocal() as db:
+            stream = await db.stream(query)
+            async for rows in stream.partitions():
+                lines = []
+                for row in rows:
+                    pending.discard((row.network, row.address))
+                    lines.append(orjson.dumps({"network": row.network, "address": row.address, "token": token_dict(row)}))
+                found += len(rows)
+                yield b"\n".join(lines) + b"\n"
+        
+        if pending:
+            yield b"\n".join(
+                orjson.dumps({"network": network, "address": address, "token": None})
+                for network, address in pending
+            ) + b"\n"
+        logger.info(f"Lookup of {found + len(pending)} address(es): {found} found")
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
-@app.get("/stats/summary", response_model=StatsResponse)
-async def get_stats_summary(db: Session = Depends(get_db)):
-    """Get statistics summary"""
-    try:
+async def compute_stats_summary() -> dict:
+    """Build the stats payload from the hourly rollup"""
+    async with SessionLocal() as db:
         now = datetime.utcnow()
-        last_24h = now - timedelta(hours=24)
         last_hour = now - timedelta(hours=1)
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        first_hour = current_hour - timedelta(hours=23)
         
-        # Total tokens
-        total_tokens = db.query(func.count(Token.id)).scalar()
+        # Totals and the 24h window per network, read from a few rows per hour
+        network_stats = (await db.execute(
+            select(
+                TokenStatsHourly.network,
+                func.sum(TokenStatsHourly.count),
+                func.sum(TokenStatsHourly.count).filter(TokenStatsHourly.hour >= first_hour)
+            ).group_by(TokenStatsHourly.network)
+        )).all()
         
-        # Tokens in last 24 hours
-        tokens_24h = db.query(func.count(Token.id)).filter(
-            Token.timestamp >= last_24h
-        ).scalar()
+        by_network = {network: int(total or 0) for network, total, _ in network_stats}
+        tokens_24h = sum(int(count_24h or 0) for _, _, count_24h in network_stats)
         
-        # Tokens in last hour
-        tokens_1h = db.query(func.count(Token.id)).filter(
-            Token.timestamp >= last_hour
-        ).scalar()
-        
-        # By network
-        by_network = {}
-        network_stats = db.query(
-            Token.network,
-            func.count(Token.id)
-        ).group_by(Token.network).all()
-        
-        for network, count in network_stats:
-            by_network[network] = count
+        # Rolling last hour: an index range scan over recent rows only
+        tokens_1h = (await db.execute(
+            select(func.count(Token.id)).where(Token.timestamp >= last_hour)
+        )).scalar()
         
         # Hourly distribution (last 24 hours)
+        hourly_counts = dict((await db.execute(
+            select(TokenStatsHourly.hour, func.sum(TokenStatsHourly.count))
+            .where(TokenStatsHourly.hour >= first_hour)
+            .group_by(TokenStatsHourly.hour)
+        )).all())
+        
+        # Fill hours without tokens, oldest to newest
         hourly_dist = []
         for i in range(24):
-            hour_start = now - timedelta(hours=i+1)
-            hour_end = now - timedelta(hours=i)
-            
-            count = db.query(func.count(Token.id)).filter(
-                and_(Token.timestamp >= hour_start, Token.timestamp < hour_end)
-            ).scalar()
-            
+            hour_start = first_hour + timedelta(hours=i)
             hourly_dist.append({
                 "hour": hour_start.strftime("%Y-%m-%d %H:00"),
-                "count": count
+                "count": int(hourly_counts.get(hour_start, 0))
             })
         
-        hourly_dist.reverse()  # Oldest to newest
-        
         return {
-            "total_tokens": total_tokens,
+            "total_tokens": sum(by_network.values()),
             "tokens_last_24h": tokens_24h,
             "tokens_last_hour": tokens_1h,
             "by_network": by_network,
             "hourly_distribution": hourly_dist
         }
+
+
+async def compute_stats_response() -> Tuple[bytes, str]:
+    """Encoded stats payload and its ETag, computed once per cache refresh"""
+    body = orjson.dumps(await compute_stats_summary())
+    return body, body_etag(body)
+
+
+# Shared by every client; refreshed in the background once stale
+stats_cache = CachedValue(compute_stats_response, ttl=settings.stats_cache_ttl)
+
+
+@app.get("/stats/summary", response_model=StatsResponse)
+async def get_stats_summary(request: Request):
+    """Get statistics summary"""
+    try:
+        body, etag = await stats_cache.get()
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
     
     except Exception as e:
         logger.error(f"Error generating stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/alerts/recent")
+@app.get("/stats/cache")
+async def get_cache_stats():
+    """Hot-token cache and live feed counters"""
+    return {
+        "token_cache": token_cache.stats(),
+        "feed": token_feed.stats()
+    }
+
+
+@app.get("/alerts/recent", response_model=List[TokenResponse])
 async def get_recent_alerts(
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get recent high-risk or notable tokens"""
     try:
         # Get tokens with risk score > 0 or unverified
-        tokens = db.query(Token).filter(
-            Token.risk_score > 0
-        ).order_by(desc(Token.timestamp)).limit(limit).all()
+        tokens = (await db.execute(
+            select_tokens().where(Token.risk_score > 0).order_by(desc(Token.timestamp)).limit(limit)
+        )).all()
         
-        return [token.to_dict() for token in tokens]
+        return Response(content=encode_tokens(tokens), media_type="application/json")
     
     except Exception as e:
         logger.error(f"Error fetching alerts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.websocket("/ws/tokens")
+async def token_websocket(
+    websocket: WebSocket,
+    network: Optional[str] = Query(None, regex="^(ETH|BSC)$"),
+    confirmed_only: bool = Query(True)
+):
+    """Push new, confirmed and removed tokens as JSON messages"""
+    await websocket.accept()
+    subscription = token_feed.subscribe(network, confirmed_only)
+    
+    async def send_events():
+        while (message := await subscription.queue.get()) is not None:
+            await websocket.send_text(message)
+        # Fell behind: 1013 asks the client to reconnect and refetch
+        await websocket.close(code=1013, reason="Client too slow")
+    
+    async def wait_for_disconnect():
+        while True:
+            await websocket.receive_text()
+    
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        token_feed.unsubscribe(subscription)
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+
+
+@app.get("/stream/tokens")
+async def token_stream(
+    network: Optional[str] = Query(None, regex="^(ETH|BSC)$"),
+    confirmed_only: bool = Query(True)
+):
+    """Server-sent events version of /ws/tokens"""
+    subscription = token_feed.subscribe(network, confirmed_only)
+    
+    async def events():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.feed_keepalive_interval
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    # Ending the stream makes EventSource reconnect and refetch
+                    return
+                yield f"data: {message}\n\n"
+        finally:
+            token_feed.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=settings.api_host, port=settings.api_port)
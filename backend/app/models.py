@@ -1,15 +1,21 @@
 from sqlalchemy import Column, Integer, String, BigInteger, Boolean, TIMESTAMP, Numeric, Text, Index
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from app.database import Base
 
 
 class Token(Base):
+    """Detected tokens, range-partitioned by month on ``timestamp``.
+
+    Postgres only enforces unique indexes on a partitioned table when they
+    include the partition key, so ``(address, network)`` uniqueness lives
+    in ``token_registry``.
+    """
     __tablename__ = "tokens"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     address = Column(Text, nullable=False)
     block_number = Column(BigInteger, nullable=False)
-    timestamp = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    timestamp = Column(TIMESTAMP, primary_key=True, nullable=False, server_default=func.now())
     network = Column(String(10), nullable=False)  # ETH, BSC
     
     # Token metadata
@@ -28,10 +34,16 @@ class Token(Base):
     risk_score = Column(Integer, default=0)
     
     __table_args__ = (
-        Index('idx_token_addr_network', 'address', 'network', unique=True),
-        Index('idx_token_timestamp', 'timestamp'),
-        Index('idx_token_network', 'network'),
-        Index('idx_token_confirmed', 'confirmed'),
+        Index('idx_token_addr_network', 'address', 'network'),
+        # Keyset pagination indexes, one per /tokens/new filter combination;
+        # scanned backwards for ORDER BY timestamp DESC, id DESC
+        Index('idx_token_ts_id', 'timestamp', 'id'),
+        Index('idx_token_network_ts_id', 'network', 'timestamp', 'id'),
+        Index('idx_token_confirmed_ts_id', 'confirmed', 'timestamp', 'id'),
+        Index('idx_token_network_confirmed_ts_id', 'network', 'confirmed', 'timestamp', 'id'),
+        # Partial index for the confirmation sweeper: only rows still waiting
+        Index('idx_token_unconfirmed', 'network', 'block_number', postgresql_where=text('NOT confirmed')),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
     
     def to_dict(self):
@@ -53,3 +65,22 @@ class Token(Base):
         }
 
 
+class TokenRegistry(Base):
+    """One row per known (address, network), pointing at the token's partition"""
+    __tablename__ = "token_registry"
+    
+    address = Column(Text, primary_key=True)
+    network = Column(String(10), primary_key=True)
+    timestamp = Column(TIMESTAMP, nullable=False)
+
+
+class TokenStatsHourly(Base):
+    """Token counts per network per hour, maintained by the ingestor alongside token writes"""
+    __tablename__ = "token_stats_hourly"
+    
+    network = Column(String(10), primary_key=True)
+    hour = Column(TIMESTAMP, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    confirmed_count = Column(BigInteger, nullable=False, default=0)
+    high_risk_count = Column(BigInteger, nullable=False, default=0)
+
@@ -0,0 +1,20 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(timestamp: datetime, token_id: int) -> str:
+    """Opaque keyset cursor pointing just after (timestamp, id)"""
+    raw = json.dumps([timestamp.isoformat(), token_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed input"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, token_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(token_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 
 
@@ -43,6 +43,15 @@ class TokenResponse(TokenBase):
         from_attributes = True
 
 
+class TokenLookupKey(BaseModel):
+    network: str = Field(..., pattern="^(ETH|BSC)$")
+    address: str
+
+
+class TokenLookupRequest(BaseModel):
+    tokens: List[TokenLookupKey] = Field(..., min_length=1, max_length=5000)
+
+
 class StatsResponse(BaseModel):
     total_tokens: int
     tokens_last_24h: int
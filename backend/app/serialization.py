@@ -0,0 +1,51 @@
+"""Bulk token serialization.
+
+Token endpoints select the ``TokenResponse`` fields as plain column tuples,
+with ``total_supply`` cast to text by Postgres, and encode them straight to
+JSON bytes with orjson. This skips ORM object construction and per-row
+Pydantic validation; the output matches ``TokenResponse``.
+"""
+from typing import Iterable, Sequence
+
+import orjson
+from sqlalchemy import Text, cast, select
+from sqlalchemy.sql import Select
+
+from app.models import Token
+
+# Same fields and order as TokenResponse
+TOKEN_COLUMNS = [
+    Token.id,
+    Token.address,
+    Token.network,
+    Token.name,
+    Token.symbol,
+    Token.decimals,
+    # Numeric(78, 0) as exact digits, without a Decimal round trip
+    cast(Token.total_supply, Text).label("total_supply"),
+    Token.block_number,
+    Token.timestamp,
+    Token.creator_address,
+    Token.tx_hash,
+    Token.confirmed,
+    Token.is_verified,
+    Token.risk_score,
+]
+TOKEN_FIELDS = tuple(column.key for column in TOKEN_COLUMNS)
+
+
+def select_tokens() -> Select:
+    """``SELECT`` of the serialized token columns, to be filtered and ordered by the caller"""
+    return select(*TOKEN_COLUMNS)
+
+
+def token_dict(row: Sequence) -> dict:
+    return dict(zip(TOKEN_FIELDS, row))
+
+
+def encode_token(row: Sequence) -> bytes:
+    return orjson.dumps(token_dict(row))
+
+
+def encode_tokens(rows: Iterable[Sequence]) -> bytes:
+    return orjson.dumps([dict(zip(TOKEN_FIELDS, row)) for row in rows])
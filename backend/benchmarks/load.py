@@ -0,0 +1,89 @@
+"""Closed-loop HTTP load test for the read endpoints.
+
+Usage:
+    python benchmarks/load.py --url http://localhost:8000 --concurrency 64 --duration 20
+
+Each client issues requests back to back; requests/s and latency percentiles
+are reported per endpoint.
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import aiohttp
+
+ENDPOINTS = {
+    "/tokens/new": "/tokens/new?page_size=50",
+    "/stats/summary": "/stats/summary",
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def client(session: aiohttp.ClientSession, url: str, deadline: float,
+                 latencies: List[float], errors: Dict[str, int]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                if response.status != 200:
+                    errors[str(response.status)] = errors.get(str(response.status), 0) + 1
+                    continue
+        except aiohttp.ClientError as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_endpoint(base_url: str, path: str, concurrency: int, duration: float) -> dict:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        # Warm up pools and caches before measuring
+        async with session.get(base_url + path) as response:
+            await response.read()
+
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            client(session, base_url + path, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50) * 1000 if latencies else 0.0,
+        "p99": percentile(latencies, 99) * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the token scanner API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per endpoint")
+    parser.add_argument("--endpoint", choices=sorted(ENDPOINTS), action="append",
+                        help="Endpoint to test (repeatable, default: all)")
+    args = parser.parse_args()
+
+    for name in args.endpoint or ENDPOINTS:
+        result = await run_endpoint(args.url.rstrip("/"), ENDPOINTS[name], args.concurrency, args.duration)
+        errors = ", ".join(f"{k}={v}" for k, v in result["errors"].items()) or "none"
+        print(
+            f"{name:<16} {result['rps']:8.1f} req/s  p50={result['p50']:.1f}ms  "
+            f"p99={result['p99']:.1f}ms  requests={result['requests']}  errors={errors}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Microbenchmark: ORM objects + response_model validation vs column tuples + orjson.
+
+Usage:
+    python benchmarks/serialization.py --rows 100 --repeat 2000
+
+No database needed; both paths start from data shaped like a query result.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models import Token  # noqa: E402
+from app.schemas import TokenResponse  # noqa: E402
+from app.serialization import encode_tokens  # noqa: E402
+
+
+def make_rows(n: int) -> List[tuple]:
+    """Rows in TOKEN_COLUMNS order, total_supply already text as Postgres returns it"""
+    now = datetime.utcnow()
+    return [
+        (i, f"0x{i:040x}", "ETH" if i % 2 else "BSC", f"Token {i}", f"TK{i}", 18,
+         str(10 ** 27 + i), 19_000_000 + i, now - timedelta(seconds=i),
+         f"0x{i + 1:040x}", f"0x{i:064x}", True, False, i % 10)
+        for i in range(n)
+    ]
+
+
+def make_orm_tokens(rows: List[tuple]) -> List[Token]:
+    return [
+        Token(id=r[0], address=r[1], network=r[2], name=r[3], symbol=r[4], decimals=r[5],
+              total_supply=Decimal(r[6]), block_number=r[7], timestamp=r[8], creator_address=r[9],
+              tx_hash=r[10], confirmed=r[11], is_verified=r[12], risk_score=r[13])
+        for r in rows
+    ]
+
+
+def bench(label: str, fn, repeat: int, rows: int):
+    fn()  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    per_call = (time.perf_counter() - started) / repeat
+    print(f"{label:<36} {per_call * 1e6:9.1f} µs/response  {per_call * 1e6 / rows:6.2f} µs/row")
+    return per_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare token serialization paths")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    orm_tokens = make_orm_tokens(rows)
+    field = create_response_field(name="Response_get_new_tokens", type_=List[TokenResponse])
+    loop = asyncio.new_event_loop()
+
+    def response_model_path():
+        # What FastAPI does for response_model=List[TokenResponse] + JSONResponse
+        content = loop.run_until_complete(serialize_response(field=field, response_content=orm_tokens))
+        return JSONResponse(content).body
+
+    def bulk_path():
+        return encode_tokens(rows)
+
+    old = bench("ORM + TokenResponse + json", response_model_path, args.repeat, args.rows)
+    new = bench("column tuples + orjson", bulk_path, args.repeat, args.rows)
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,30 @@
-import React, { useState, useEffect } from 'react';
-import { getNewTokens, getStats } from './services/api';
+import React, { useState, useEffect, useRef } from 'react';
+import { getNewTokens, getStats, subscribeTokens } from './services/api';
 import TokenTable from './components/TokenTable';
 import StatsCards from './components/StatsCards';
 import ChartSection from './components/ChartSection';
 import Header from './components/Header';
 import NetworkFilter from './components/NetworkFilter';
 
+const PAGE_SIZE = 20;
+const STATS_REFRESH_DELAY = 5000;
+
+// Newest first, like /tokens/new
+const byNewest = (a, b) => (b.timestamp.localeCompare(a.timestamp) || b.id - a.id);
+
 function App() {
   const [tokens, setTokens] = useState([]);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [selectedNetwork, setSelectedNetwork] = useState(null);
   const [currentPage, setCurrentPage] = useState(1);
+  const statsTimer = useRef(null);
 
-  const fetchData = async () => {
+  const fetchData = async (showLoading = true) => {
     try {
-      setLoading(true);
+      if (showLoading) setLoading(true);
       const [tokensData, statsData] = await Promise.all([
-        getNewTokens(currentPage, 20, selectedNetwork, true),
+        getNewTokens(currentPage, PAGE_SIZE, selectedNetwork, true),
         getStats()
       ]);
       
@@ -26,17 +33,63 @@ function App() {
     } catch (error) {
       console.error('Error fetching data:', error);
     } finally {
-      setLoading(false);
+      if (showLoading) setLoading(false);
+    }
+  };
+
+  // Coalesce the stats refreshes triggered by a burst of token events
+  const scheduleStatsRefresh = () => {
+    if (statsTimer.current) return;
+    statsTimer.current = setTimeout(async () => {
+      statsTimer.current = null;
+      try {
+        setStats(await getStats());
+      } catch (error) {
+        console.error('Error fetching stats:', error);
+      }
+    }, STATS_REFRESH_DELAY);
+  };
+
+  const handleTokenEvent = ({ type, tokens: changed }) => {
+    if (type === 'resync') {
+      fetchData(false);
+      return;
+    }
+    
+    scheduleStatsRefresh();
+    const changedIds = new Set(changed.map((token) => token.id));
+    
+    if (type === 'removed') {
+      setTokens((current) => current.filter((token) => !changedIds.has(token.id)));
+    } else if (currentPage === 1) {
+      // Only the first page moves; later pages are fetched on demand
+      setTokens((current) => [
+        ...changed,
+        ...current.filter((token) => !changedIds.has(token.id))
+      ].sort(byNewest).slice(0, PAGE_SIZE));
     }
   };
 
   useEffect(() => {
     fetchData();
     
-    // Auto-refresh every 30 seconds
-    const interval = setInterval(fetchData, 30000);
+    // Live updates instead of polling; refetch whenever the stream reconnects
+    let connected = false;
+    const unsubscribe = subscribeTokens({
+      network: selectedNetwork,
+      confirmedOnly: true,
+      onEvent: handleTokenEvent,
+      onOpen: () => {
+        if (connected) fetchData(false);
+        connected = true;
+      }
+    });
     
-    return () => clearInterval(interval);
+    return () => {
+      unsubscribe();
+      clearTimeout(statsTimer.current);
+      statsTimer.current = null;
+    };
   }, [currentPage, selectedNetwork]);
 
   return (
@@ -7,6 +7,30 @@ const api = axios.create({
   headers: {
     'Content-Type': 'application/json',
   },
+  // 304 Not Modified is answered from the validator cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Last ETag, body and headers per GET URL; sent back as If-None-Match so
+// unchanged lists and stats cost the server one version lookup and no body
+const validators = new Map();
+
+api.interceptors.request.use((config) => {
+  const cached = config.method === 'get' && validators.get(api.getUri(config));
+  if (cached) config.headers['If-None-Match'] = cached.etag;
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  const key = api.getUri(response.config);
+  if (response.status === 304) {
+    const cached = validators.get(key);
+    return { ...response, status: 200, data: cached.data, headers: cached.headers };
+  }
+  if (response.config.method === 'get' && response.headers.etag) {
+    validators.set(key, { etag: response.headers.etag, data: response.data, headers: response.headers });
+  }
+  return response;
 });
 
 // Token endpoints
@@ -40,6 +64,20 @@ export const getRecentAlerts = async (limit = 10) => {
   return response.data;
 };
 
+// Live token feed (server-sent events). Calls onEvent with
+// { type: 'new' | 'confirmed' | 'removed' | 'resync', tokens } and onOpen on
+// every (re)connect, after which events missed while disconnected must be refetched.
+export const subscribeTokens = ({ network = null, confirmedOnly = true, onEvent, onOpen }) => {
+  const params = new URLSearchParams({ confirmed_only: confirmedOnly });
+  if (network) params.set('network', network);
+
+  const source = new EventSource(`${API_URL}/stream/tokens?${params}`);
+  source.onmessage = (message) => onEvent(JSON.parse(message.data));
+  if (onOpen) source.onopen = onOpen;
+
+  return () => source.close();
+};
+
 // Health check
 export const healthCheck = async () => {
   const response = await api.get('/health');
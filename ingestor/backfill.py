@@ -0,0 +1,288 @@
+"""Historical backfill: scan a past block range with a pool of worker processes.
+
+    python backfill.py --network BSC --from 35000000 --to 35028800 --workers 8
+
+The range is split into shards whose progress is stored in ``backfill_shards``
+together with the tokens they found, so re-running the same command after a
+crash resumes every shard where it stopped.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import List, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from config import get_settings
+from database import Base, engine
+from models import BackfillShard
+from persistence import TokenWriter
+from rpc import JsonRpcClient
+import partitions
+
+settings = get_settings()
+
+
+class ShardWriter(TokenWriter):
+    """TokenWriter that records progress on a backfill shard instead of the live checkpoint.
+
+    Failed blocks are kept in the worker rather than in ``block_retries``,
+    whose retrier would process them as live blocks. Shard progress stops
+    before the first of them until it is recovered.
+    """
+
+    # Historical tokens are not news to live feed clients
+    publish = False
+
+    def __init__(self, shard_id: int, end_block: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_id = shard_id
+        self.end_block = end_block
+        self.pending: Set[int] = set()
+
+    async def add_failed(self, block_number: int, error: Exception, retry_at: datetime):
+        self.pending.add(block_number)
+
+    async def resolve_retry(self, block_number: int):
+        self.pending.discard(block_number)
+        self._touch()
+
+    def _write_checkpoint(self, conn, checkpoint: int):
+        if self.pending:
+            checkpoint = min(checkpoint, min(self.pending) - 1)
+        conn.execute(
+            update(BackfillShard)
+            .where(BackfillShard.id == self.shard_id)
+            .values(next_block=checkpoint + 1, completed=checkpoint >= self.end_block)
+        )
+
+
+def split_range(from_block: int, to_block: int, shard_count: int) -> List[Tuple[int, int]]:
+    """Split [from_block, to_block] into contiguous, nearly equal shards"""
+    total = to_block - from_block + 1
+    shard_count = max(1, min(shard_count, total))
+    size, extra = divmod(total, shard_count)
+
+    shards = []
+    start = from_block
+    for i in range(shard_count):
+        end = start + size - 1 + (1 if i < extra else 0)
+        shards.append((start, end))
+        start = end + 1
+    return shards
+
+
+def plan_shards(network: str, from_block: int, to_block: int, shard_count: int) -> list:
+    """Register the shards of a range (if new) and return the unfinished ones.
+
+    Shards already recorded inside the range are reused as they are, whatever
+    ``shard_count`` was then, and only the blocks none of them cover get new
+    shards. A recorded shard that straddles the range's edge would be scanned
+    twice, so it is rejected with ``ValueError``.
+    """
+    with engine.begin() as conn:
+        existing = conn.execute(
+            select(BackfillShard).where(
+                BackfillShard.network == network,
+                BackfillShard.start_block <= to_block,
+                BackfillShard.end_block >= from_block
+            ).order_by(BackfillShard.start_block)
+        ).all()
+
+        straddling = [shard for shard in existing if shard.start_block < from_block or shard.end_block > to_block]
+        if straddling:
+            raise ValueError(
+                f"{from_block}-{to_block} cuts through existing {network} shard(s) "
+                + ", ".join(f"{shard.start_block}-{shard.end_block}" for shard in straddling)
+                + "; use a range that contains them whole"
+            )
+
+        # Blocks not covered by any recorded shard, each split in proportion to its size
+        gaps = []
+        cursor = from_block
+        for shard in existing:
+            if shard.start_block > cursor:
+                gaps.append((cursor, shard.start_block - 1))
+            cursor = max(cursor, shard.end_block + 1)
+        if cursor <= to_block:
+            gaps.append((cursor, to_block))
+
+        total = to_block - from_block + 1
+        ranges = [
+            shard_range
+            for start, end in gaps
+            for shard_range in split_range(start, end, max(1, round(shard_count * (end - start + 1) / total)))
+        ]
+        if existing:
+            logger.info(
+                f"🧩 Reusing {len(existing)} recorded shard(s) of {network} {from_block}-{to_block}"
+                + (f", adding {len(ranges)} for uncovered blocks" if ranges else "")
+            )
+        if ranges:
+            conn.execute(insert(BackfillShard).values([
+                {'network': network, 'start_block': start, 'end_block': end, 'next_block': start, 'completed': False}
+                for start, end in ranges
+            ]).on_conflict_do_nothing(index_elements=['network', 'start_block', 'end_block']))
+
+        return conn.execute(
+            select(BackfillShard).where(
+                BackfillShard.network == network,
+                BackfillShard.start_block >= from_block,
+                BackfillShard.end_block <= to_block,
+                BackfillShard.completed == False
+            ).order_by(BackfillShard.start_block)
+        ).all()
+
+
+async def backfill_shard(network: str, shard_id: int, next_block: int, end_block: int, concurrency: int) -> Tuple[int, int]:
+    """Process one shard; returns (blocks processed, tokens written)"""
+    # Imported here so each worker process builds its own RPC and DB connections
+    from main import BlockchainMonitor
+
+    monitor = BlockchainMonitor(network=network, historical=True, **settings.rpc_config(network))
+    monitor.pipeline = monitor.build_pipeline(concurrency)
+    monitor.writer = ShardWriter(
+        shard_id, end_block, network,
+        batch_size=settings.db_batch_size, flush_interval=settings.db_flush_interval, logger=monitor.logger
+    )
+
+    # Historical blocks are far below head, one snapshot serves the whole shard
+    head = await monitor.w3.eth.block_number
+    pipeline = monitor.pipeline
+    pipeline.start(next_block - 1)
+
+    async def feed():
+        while pipeline.next_block <= end_block:
+            await pipeline.submit(head)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        chunk_end = next_block - 1
+        while chunk_end < end_block:
+            # Progress is saved per chunk while later blocks are already in the pipeline;
+            # raises if the pipeline was aborted, failing the shard
+            chunk_end = min(end_block, chunk_end + settings.catchup_chunk_size)
+            await pipeline.wait_committed(chunk_end)
+            await monitor.writer.flush()
+            logger.info(f"🧱 Shard {shard_id} on {network}: {chunk_end - next_block + 1} blocks done, next {chunk_end + 1}/{end_block}")
+
+        await feeder
+        await retry_failed_blocks(monitor, shard_id)
+    finally:
+        feeder.cancel()
+        await pipeline.stop()
+        await monitor.rpc.close()
+    return end_block - next_block + 1, monitor.writer.tokens_written
+
+
+async def block_timestamp(network: str, block_number: int) -> datetime:
+    client = JsonRpcClient(settings.rpc_config(network)["rpc_url"])
+    try:
+        block = await client.call("eth_getBlockByNumber", [hex(block_number), False])
+    finally:
+        await client.close()
+    return datetime.utcfromtimestamp(int(block["timestamp"], 16))
+
+
+async def retry_failed_blocks(monitor, shard_id: int):
+    """Retry the shard's failed blocks in this worker, with the live retry queue's backoff"""
+    writer, retrier = monitor.writer, monitor.retrier
+    for attempt in range(1, retrier.limit):
+        if not writer.pending:
+            break
+        await asyncio.sleep(min(retrier.base_delay * 2 ** (attempt - 1), retrier.max_delay))
+        for block_number in sorted(writer.pending):
+            try:
+                ctx = await retrier.run_stages(block_number)
+            except Exception as e:
+                logger.warning(f"♻️ Shard {shard_id}: retry {attempt} of block {block_number} failed: {e}")
+                continue
+            await writer.add(ctx.token_rows)
+            await writer.resolve_retry(block_number)
+            logger.success(f"♻️ Shard {shard_id}: recovered block {block_number} with {len(ctx.token_rows)} token(s)")
+        # Moves shard progress past the recovered blocks
+        await writer.mark_processed(writer.end_block)
+        await writer.flush()
+
+    if writer.pending:
+        logger.error(
+            f"❌ Shard {shard_id}: {len(writer.pending)} block(s) still failing from {min(writer.pending)}, "
+            f"shard left incomplete; re-run the backfill to retry them"
+        )
+
+
+def run_shard(network: str, shard_id: int, next_block: int, end_block: int, concurrency: int) -> Tuple[int, int]:
+    """Process pool entry point"""
+    return asyncio.run(backfill_shard(network, shard_id, next_block, end_block, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill tokens from a historical block range")
+    parser.add_argument("--network", required=True, choices=["ETH", "BSC"])
+    parser.add_argument("--from", dest="from_block", type=int, required=True)
+    parser.add_argument("--to", dest="to_block", type=int, required=True)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker processes")
+    parser.add_argument("--shards", type=int, default=None, help="Number of shards (default: 4 per worker)")
+    parser.add_argument("--concurrency", type=int, default=settings.max_concurrent_blocks,
+                        help="Blocks in flight per worker")
+    args = parser.parse_args()
+
+    if args.to_block < args.from_block:
+        parser.error("--to must not be lower than --from")
+
+    Base.metadata.create_all(bind=engine)
+    partitions.maintain()
+    # Tokens are dated by their block, so the range's past months need partitions too
+    with engine.begin() as conn:
+        partitions.ensure_partitions(conn, since=asyncio.run(block_timestamp(args.network, args.from_block)))
+    shard_count = args.shards or args.workers * 4
+    try:
+        shards = plan_shards(args.network, args.from_block, args.to_block, shard_count)
+    except ValueError as e:
+        parser.error(str(e))
+    if not shards:
+        logger.info(f"✅ Backfill of {args.network} {args.from_block}-{args.to_block} already complete")
+        return
+
+    remaining = sum(shard.end_block - shard.next_block + 1 for shard in shards)
+    logger.info(f"🚚 Backfilling {args.network}: {len(shards)} shard(s), {remaining} blocks, {args.workers} workers")
+
+    started = time.monotonic()
+    blocks_done = tokens_done = 0
+    # spawn: workers must not inherit the parent's DB pool or event loop
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(run_shard, args.network, shard.id, shard.next_block, shard.end_block, args.concurrency): shard
+            for shard in shards
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                blocks, tokens = future.result()
+            except Exception as e:
+                logger.error(f"❌ Shard {shard.id} ({shard.start_block}-{shard.end_block}) failed: {e}")
+                continue
+
+            blocks_done += blocks
+            tokens_done += tokens
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"📈 {blocks_done}/{remaining} blocks, {tokens_done} tokens "
+                f"({blocks_done / elapsed:.1f} blocks/s, {tokens_done / elapsed:.2f} tokens/s)"
+            )
+
+    elapsed = time.monotonic() - started
+    logger.success(
+        f"🏁 Backfill finished in {elapsed:.0f}s: {blocks_done} blocks, {tokens_done} tokens "
+        f"({blocks_done / max(elapsed, 1e-9):.1f} blocks/s, {tokens_done / max(elapsed, 1e-9):.2f} tokens/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
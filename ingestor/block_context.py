@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+from metrics import RpcCounter
+from reorg import BlockHeader
+
+
+@dataclass
+class BlockContext:
+    """Everything already fetched for one block, shared by all processing steps.
+
+    ``head`` is a single chain-head snapshot taken before the block is
+    processed, so confirmation checks don't cost an RPC per token. The
+    pipeline stages fill in the rest as the block moves through them.
+    """
+
+    network: str
+    block_number: int
+    block: Any
+    head: int
+    rpc: RpcCounter = field(default_factory=RpcCounter)
+    header: Optional[BlockHeader] = None
+    # (creation tx, contract address) pairs found in the block's receipts
+    deployments: List[Tuple[Any, str]] = field(default_factory=list)
+    token_rows: List[dict] = field(default_factory=list)
+    error: Optional[Exception] = None
+
+    @property
+    def transactions(self) -> List[Any]:
+        return self.block.transactions if self.block else []
+
+    @property
+    def creation_transactions(self) -> List[Any]:
+        # Contract creations have no "to" address
+        return [tx for tx in self.transactions if tx['to'] is None]
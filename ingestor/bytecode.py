@@ -0,0 +1,90 @@
+"""Cheap ERC-20 classification of contract bytecode before metadata probing.
+
+Solidity and Vyper dispatchers compare the call's selector against PUSH4
+constants, and events are emitted with their topic as a PUSH32 constant, so
+an ERC-20 contract carries the standard selectors and the ``Transfer``
+topic as plain byte sequences in its code. Creation input contains the
+runtime code, so contracts deployed by a block's own transactions are
+classified without any RPC.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+# name(), symbol(), decimals(), totalSupply(), transfer(address,uint256), balanceOf(address)
+ERC20_SELECTORS = [bytes.fromhex(selector) for selector in (
+    "06fdde03", "95d89b41", "313ce567", "18160ddd", "a9059cbb", "70a08231",
+)]
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = bytes.fromhex("ddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef")
+MIN_SELECTORS = 2
+
+# Proxies delegate every call, so their own code says nothing about the token behind them
+PROXY_MARKERS = [bytes.fromhex(marker) for marker in (
+    "363d3d373d3d3d363d73",  # EIP-1167 minimal proxy
+    "360894a13ba1a3210667c828492db98dca3e2076cc3735a920a3ca505d382bbc",  # EIP-1967 implementation slot
+    "a3f0ad74e5423aebfd80d3ef4346578335a9a72aeaee59ff6cb3582b35133d50",  # EIP-1967 beacon slot
+    "7050c9e0f4ca769c69bd3a8ef740bc37934f8e2c036e5a723fd8ee048ed3f8c3",  # OpenZeppelin legacy proxy slot
+)]
+
+TOKEN = "token"
+PROXY = "proxy"
+NOT_TOKEN = "not_token"
+
+
+def classify_bytecode(code: bytes) -> str:
+    """Return ``TOKEN``, ``PROXY`` or ``NOT_TOKEN`` for creation input or runtime code"""
+    if any(marker in code for marker in PROXY_MARKERS):
+        return PROXY
+    if TRANSFER_TOPIC in code and sum(selector in code for selector in ERC20_SELECTORS) >= MIN_SELECTORS:
+        return TOKEN
+    return NOT_TOKEN
+
+
+class BytecodeFilter:
+    """Classify contracts with ``classify_bytecode``, caching verdicts by code hash.
+
+    Factory clones and copy-paste deployments share their code, so each
+    distinct code is scanned once. Only contracts classified as
+    ``NOT_TOKEN`` are skipped; proxies still go to metadata probing.
+    """
+
+    def __init__(self, max_entries: int = 10000, calls_per_probe: int = 4):
+        self.max_entries = max_entries
+        self.calls_per_probe = calls_per_probe
+        self.verdicts: "OrderedDict[bytes, str]" = OrderedDict()
+        self.classified = 0
+        self.cache_hits = 0
+        self.skipped = 0
+
+    @staticmethod
+    def code_hash(code: bytes) -> bytes:
+        return hashlib.blake2b(code, digest_size=16).digest()
+
+    def classify(self, code: Optional[bytes]) -> str:
+        code = bytes(code or b"")
+        key = self.code_hash(code)
+        verdict = self.verdicts.get(key)
+        if verdict is not None:
+            self.verdicts.move_to_end(key)
+            self.cache_hits += 1
+        else:
+            verdict = classify_bytecode(code)
+            self.verdicts[key] = verdict
+            if len(self.verdicts) > self.max_entries:
+                self.verdicts.popitem(last=False)
+
+        self.classified += 1
+        if verdict == NOT_TOKEN:
+            self.skipped += 1
+        return verdict
+
+    def is_candidate(self, code: Optional[bytes]) -> bool:
+        """True if the contract should be probed for token metadata"""
+        return self.classify(code) != NOT_TOKEN
+
+    def summary(self) -> str:
+        return (
+            f"{self.skipped}/{self.classified} contracts skipped, "
+            f"{self.skipped * self.calls_per_probe} metadata calls avoided, {self.cache_hits} cache hits"
+        )
@@ -6,7 +6,7 @@ class Settings(BaseSettings):
     # Database
     database_url: str = "postgresql://scanner:scanner123@db:5432/token_scanner"
     
-    # Ethereum
+    # Ethereum; *_RPC_URL takes comma-separated "url[|weight[|requests_per_second]]" endpoints
     eth_rpc_url: str = "https://eth-mainnet.g.alchemy.com/v2/your-api-key"
     eth_ws_url: str = "wss://eth-mainnet.g.alchemy.com/v2/your-api-key"
     
@@ -14,8 +14,85 @@ class Settings(BaseSettings):
     bsc_rpc_url: str = "https://bsc-dataseed.binance.org/"
     bsc_ws_url: str = "wss://bsc-ws-node.nariox.org:443"
     
+    # Expected block times (seconds), refined from observed heads at runtime
+    eth_block_time: float = 12.0
+    bsc_block_time: float = 3.0
+    
+    # Head tracking: newHeads subscription with HTTP polling fallback
+    head_poll_min_interval: float = 0.5
+    head_poll_max_interval: float = 15.0
+    ws_retry_interval: float = 60.0
+    
     # Confirmation settings
     confirmation_blocks: int = 3
+    reorg_buffer_size: int = 128
+    
+    # Risk score from which a token counts as high risk in the stats rollup
+    high_risk_score: int = 5
+    
+    # Block pipeline: workers per stage, bounded queues between stages,
+    # blocks in flight per network and blocks submitted per head refresh
+    fetch_concurrency: int = 8
+    detect_concurrency: int = 8
+    probe_concurrency: int = 4
+    pipeline_queue_size: int = 16
+    max_concurrent_blocks: int = 32
+    catchup_chunk_size: int = 50
+    
+    # Failed blocks: retried with exponential backoff, dead-lettered after the limit
+    block_retry_limit: int = 8
+    block_retry_base_delay: float = 30.0
+    block_retry_max_delay: float = 3600.0
+    block_retry_poll_interval: float = 10.0
+    block_retry_concurrency: int = 2
+    
+    # Receipt fetching: "auto", "block_receipts" (eth_getBlockReceipts) or "batch"
+    eth_receipts_method: str = "auto"
+    bsc_receipts_method: str = "auto"
+    rpc_batch_size: int = 100
+    
+    # Token metadata probing via Multicall3 (falls back to batched eth_call)
+    multicall3_address: str = "0xcA11bde05977b3631167028862bE2a173976CA11"
+    multicall_chunk_size: int = 50
+    
+    # Contracts deployed by other contracts: "auto", "trace_block", "debug_trace" (geth callTracer),
+    # "logs" (scan for first mints from the zero address) or "off"
+    eth_internal_deployments: str = "auto"
+    bsc_internal_deployments: str = "auto"
+    log_scan_range: int = 100
+    log_scan_interval: float = 2.0
+    known_address_cache_size: int = 100000
+    
+    # Bytecode pre-filter: only contracts with ERC-20 selectors and Transfer topic are probed
+    bytecode_prefilter: bool = True
+    bytecode_cache_size: int = 10000
+    
+    # Write-behind token persistence
+    db_batch_size: int = 500
+    db_flush_interval: float = 0.5
+    
+    # Monthly tokens partitions: created ahead of time, archived after retention
+    partition_months_ahead: int = 2
+    token_retention_months: int = 12  # 0 keeps every partition
+    archive_dir: str = "archive"
+    partition_maintenance_interval: float = 3600.0
+    
+    # RPC endpoint pool: default per-endpoint rate limit, circuit breaker, HTTP connections
+    rpc_rate_limit: float = 25.0
+    rpc_failure_threshold: int = 5
+    rpc_open_interval: float = 30.0
+    rpc_pool_size: int = 100
+    
+    def rpc_config(self, network: str) -> dict:
+        """Connection settings of one network, as BlockchainMonitor kwargs"""
+        prefix = network.lower()
+        return {
+            "rpc_url": getattr(self, f"{prefix}_rpc_url"),
+            "ws_url": getattr(self, f"{prefix}_ws_url"),
+            "receipts_method": getattr(self, f"{prefix}_receipts_method"),
+            "block_time": getattr(self, f"{prefix}_block_time"),
+            "internal_deployments": getattr(self, f"{prefix}_internal_deployments"),
+        }
     
     class Config:
         env_file = ".env"
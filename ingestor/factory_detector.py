@@ -0,0 +1,280 @@
+"""Detection of contracts deployed by other contracts (factories, launchpads, CREATE2 deployers).
+
+Receipts only reveal top-level creations (``tx.to is None``). Where the node
+supports it, the block's traces list the CREATE/CREATE2 frames inside other
+transactions together with their init code: Parity-style ``trace_block``
+first, then geth's ``debug_traceBlockByNumber`` with the call tracer. In
+``auto`` mode the first block decides which one this network uses.
+
+Nodes without either fall back to log scanning: ranges of blocks the
+pipeline has committed are searched with one ``eth_getLogs`` each for
+ERC-20 ``Transfer`` events from the zero address, since nearly every token
+mints in its constructor. Emitters not seen before and not in
+``token_registry`` are pre-filtered by runtime code and probed like any
+other new contract. The scan position is checkpointed on its own row.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger as global_logger
+from sqlalchemy import select
+
+from block_context import BlockContext
+from bytecode import TRANSFER_TOPIC
+from database import engine
+from models import TokenRegistry
+from persistence import TokenWriter
+from rpc import RpcError
+
+TRACE_BLOCK = "trace_block"
+DEBUG_TRACE = "debug_trace"
+LOGS = "logs"
+AUTO = "auto"
+OFF = "off"
+
+TRANSFER_TOPIC_HEX = "0x" + TRANSFER_TOPIC.hex()
+ZERO_TOPIC = "0x" + "00" * 32
+
+
+def _code(hex_code: Optional[str]) -> bytes:
+    return bytes.fromhex(hex_code[2:]) if hex_code and hex_code.startswith("0x") else b""
+
+
+class LogScanWriter(TokenWriter):
+    """TokenWriter that checkpoints the log scan position instead of the pipeline's"""
+
+    @property
+    def checkpoint_key(self) -> str:
+        return f"{self.network}:logs"
+
+
+class FactoryDetector:
+    """Find contracts created inside transactions for one network's monitor"""
+
+    def __init__(self, monitor, mode: str = AUTO, log_range: int = 100, poll_interval: float = 2.0,
+                 seen_size: int = 100000, batch_size: int = 100, confirmation_blocks: int = 3, logger=None):
+        self.monitor = monitor
+        self.network = monitor.network
+        self.client = monitor.rpc
+        self.mode = mode
+        self.max_log_range = log_range
+        self.log_range = log_range
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.confirmation_blocks = confirmation_blocks
+        self.logger = logger or global_logger
+
+        # Addresses already handled, so repeated mints don't cost a lookup each
+        self.seen_size = seen_size
+        self.seen: "OrderedDict[str, None]" = OrderedDict()
+        self.cursor: Optional[int] = None
+        self.writer = LogScanWriter(
+            self.network, batch_size=monitor.writer.batch_size, flush_interval=monitor.writer.flush_interval,
+            logger=self.logger
+        )
+        self.found = 0
+
+    def mark_seen(self, addresses: Iterable[str]):
+        for address in addresses:
+            self.seen[address.lower()] = None
+            self.seen.move_to_end(address.lower())
+        while len(self.seen) > self.seen_size:
+            self.seen.popitem(last=False)
+
+    async def rewind(self, block_number: int):
+        """Forget progress above ``block_number``, e.g. after a reorg"""
+        # Orphaned tokens may be re-mined under the same address
+        self.seen.clear()
+        if self.cursor is not None and self.cursor > block_number:
+            self.cursor = block_number
+            await self.writer.discard_above(block_number)
+            await self.writer.reset_checkpoint(block_number)
+
+    async def _trace_block(self, ctx: BlockContext) -> List[Tuple[str, str, str]]:
+        traces = await self.client.call("trace_block", [hex(ctx.block_number)]) or []
+        return [
+            (trace['transactionHash'], trace['result']['address'], trace['action'].get('init'))
+            for trace in traces
+            # An empty traceAddress is the transaction itself, already covered by receipts
+            if trace.get('type') == 'create' and trace.get('traceAddress')
+            and not trace.get('error') and trace.get('result')
+        ]
+
+    async def _debug_trace(self, ctx: BlockContext) -> List[Tuple[str, str, str]]:
+        results = await self.client.call(
+            "debug_traceBlockByNumber", [hex(ctx.block_number), {"tracer": "callTracer"}]
+        ) or []
+        creations = []
+        for index, item in enumerate(results):
+            # Older geth returns bare results, in transaction order
+            tx_hash = item.get('txHash') or ctx.transactions[index]['hash'].hex()
+            frames = list(item.get('result', {}).get('calls') or [])
+            while frames:
+                frame = frames.pop()
+                if frame.get('type') in ('CREATE', 'CREATE2') and frame.get('to') and not frame.get('error'):
+                    creations.append((tx_hash, frame['to'], frame.get('input')))
+                frames.extend(frame.get('calls') or [])
+        return creations
+
+    async def _traced_creations(self, ctx: BlockContext) -> Optional[List[Tuple[str, str, str]]]:
+        """(tx hash, address, init code) of internal creations, or None without trace support"""
+        # Several detect workers may resolve ``auto`` at once; each decides from the mode it started with
+        configured = self.mode
+        for mode, trace in ((TRACE_BLOCK, self._trace_block), (DEBUG_TRACE, self._debug_trace)):
+            if configured not in (AUTO, mode):
+                continue
+            try:
+                creations = await trace(ctx)
+            except RpcError as e:
+                if configured != AUTO or not e.is_method_unsupported:
+                    raise
+                continue
+            if self.mode == AUTO:
+                self.mode = mode
+                self.logger.info(f"🏭 Detecting factory deployments on {self.network} with {mode}")
+            return creations
+
+        if self.mode == AUTO:
+            self.mode = LOGS
+            self.logger.info(f"🏭 No trace API on {self.network}, detecting factory tokens from mint logs")
+        return None
+
+    async def block_deployments(self, ctx: BlockContext) -> List[Tuple[Any, str]]:
+        """Pipeline step: internal creations of the block, as (top-level tx, address) pairs"""
+        if self.mode in (OFF, LOGS) or not ctx.transactions:
+            return []
+        creations = await self._traced_creations(ctx)
+        if not creations:
+            return []
+
+        bytecode_filter = self.monitor.bytecode_filter
+        txs = {tx['hash'].hex().lower(): tx for tx in ctx.transactions}
+        deployments = []
+        for tx_hash, address, init_code in creations:
+            tx = txs.get(tx_hash.lower())
+            if tx is None or (bytecode_filter and not bytecode_filter.is_candidate(_code(init_code))):
+                continue
+            self.logger.info(f"🏭 New contract deployed by {tx['to']}: {address}")
+            deployments.append((tx, address))
+        return deployments
+
+    def unknown_addresses(self, addresses: List[str]) -> List[str]:
+        """Drop addresses already in ``token_registry``"""
+        with engine.connect() as conn:
+            known = set(conn.execute(
+                select(TokenRegistry.address).where(
+                    TokenRegistry.network == self.network, TokenRegistry.address.in_(addresses)
+                )
+            ).scalars())
+        return [address for address in addresses if address not in known]
+
+    async def _runtime_candidates(self, addresses: List[str]) -> List[str]:
+        bytecode_filter = self.monitor.bytecode_filter
+        if not bytecode_filter:
+            return addresses
+        candidates = []
+        for i in range(0, len(addresses), self.batch_size):
+            chunk = addresses[i:i + self.batch_size]
+            codes = await self.client.batch([("eth_getCode", [address, "latest"]) for address in chunk])
+            for address, code in zip(chunk, codes):
+                # Unknown code is probed rather than dropped
+                if isinstance(code, RpcError) or bytecode_filter.is_candidate(_code(code)):
+                    candidates.append(address)
+        return candidates
+
+    async def scan_logs(self, from_block: int, to_block: int) -> int:
+        """Record tokens whose first mint falls in ``[from_block, to_block]``; returns how many"""
+        logs = await self.client.call("eth_getLogs", [{
+            "fromBlock": hex(from_block), "toBlock": hex(to_block),
+            "topics": [TRANSFER_TOPIC_HEX, ZERO_TOPIC],
+        }]) or []
+
+        first_mints: Dict[str, dict] = {}
+        for log in logs:
+            # ERC-721 mints index the token id as a fourth topic
+            if len(log.get('topics', [])) != 3 or log.get('removed'):
+                continue
+            address = log['address'].lower()
+            if address not in self.seen and address not in first_mints:
+                first_mints[address] = log
+
+        rows = []
+        if first_mints:
+            addresses = await asyncio.to_thread(self.unknown_addresses, list(first_mints))
+            addresses = await self._runtime_candidates(addresses)
+            metadata_by_address = await self.monitor.prober.fetch_metadata(addresses)
+
+            head = self.monitor.head_source.head or to_block
+            for address in addresses:
+                metadata = metadata_by_address.get(address)
+                if not metadata:
+                    continue
+                log = first_mints[address]
+                block_number = int(log['blockNumber'], 16)
+                token_data = {
+                    'address': address,
+                    'block_number': block_number,
+                    'name': metadata.get('name'),
+                    'symbol': metadata.get('symbol'),
+                    'decimals': metadata.get('decimals'),
+                    'total_supply': metadata.get('total_supply'),
+                    # The factory's caller is not in the log; only the transaction is
+                    'creator_address': None,
+                    'tx_hash': log['transactionHash']
+                }
+                confirmed = self.monitor.detector.is_token_confirmed(block_number, head, self.confirmation_blocks)
+                rows.append(self.monitor.build_token_row(token_data, confirmed))
+                self.logger.info(
+                    f"🏭 Token {token_data['name'] or 'Unknown'} ({token_data['symbol'] or 'N/A'}) "
+                    f"minted at {address[:10]}... on {self.network}"
+                )
+
+        # Tokens and scan position commit together
+        await self.writer.add(rows)
+        await self.writer.mark_processed(to_block)
+        if not await self.writer.flush():
+            # The writer keeps the rows and checkpoint queued; the range is scanned again
+            raise RuntimeError(f"could not save mint log scan up to block {to_block}")
+        # Only once written, so a failed scan retries them
+        self.mark_seen(first_mints)
+        self.found += len(rows)
+        return len(rows)
+
+    async def run(self):
+        """Scan mint logs behind the pipeline, in ranges of up to ``log_range`` blocks, while in logs mode"""
+        while True:
+            pipeline = self.monitor.pipeline
+            if self.mode != LOGS or pipeline.committed is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                if self.cursor is None:
+                    self.cursor = await asyncio.to_thread(self.writer.load_checkpoint)
+                    if self.cursor is None:
+                        self.cursor = pipeline.committed
+                        self.logger.info(f"🏭 Scanning mint logs on {self.network} from block {self.cursor + 1}")
+                if pipeline.committed <= self.cursor:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                to_block = min(pipeline.committed, self.cursor + self.log_range)
+                await self.scan_logs(self.cursor + 1, to_block)
+                self.cursor = to_block
+                self.log_range = min(self.max_log_range, self.log_range * 2)
+            except RpcError as e:
+                # Typically too many results for the range: retry with a smaller one
+                self.log_range = max(1, self.log_range // 2)
+                self.logger.warning(f"Mint log scan on {self.network} failed ({e}), range now {self.log_range} blocks")
+                await asyncio.sleep(self.poll_interval)
+            except Exception as e:
+                self.logger.error(f"Mint log scan on {self.network} failed: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def summary(self) -> str:
+        if self.mode != LOGS or self.cursor is None:
+            return self.mode
+        return (
+            f"{self.mode}, {self.found} found, {self.monitor.pipeline.committed - self.cursor} blocks behind, "
+            f"range {self.log_range}"
+        )
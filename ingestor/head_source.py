@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+from typing import Optional
+
+import websockets
+from web3 import AsyncWeb3
+from loguru import logger as global_logger
+
+
+class HeadSource:
+    """Track the chain head of one network.
+
+    Heads are pushed by an ``eth_subscribe("newHeads")`` WebSocket subscription.
+    While the socket is down the source polls ``eth_blockNumber`` over HTTP at
+    half the observed block time, and retries the subscription every
+    ``ws_retry_interval`` seconds.
+    """
+
+    def __init__(self, w3: AsyncWeb3, ws_url: Optional[str], network: str, block_time: float = 12.0,
+                 poll_min_interval: float = 0.5, poll_max_interval: float = 15.0,
+                 ws_retry_interval: float = 60.0, logger=None):
+        self.w3 = w3
+        self.ws_url = ws_url
+        self.network = network
+        self.block_time = block_time
+        self.poll_min_interval = poll_min_interval
+        self.poll_max_interval = poll_max_interval
+        self.ws_retry_interval = ws_retry_interval
+        self.logger = logger or global_logger
+
+        self.head: Optional[int] = None
+        self.mode = "poll"
+        self._head_seen_at: Optional[float] = None
+        self._head_timestamp: Optional[int] = None
+        self._new_head = asyncio.Event()
+
+    @property
+    def poll_interval(self) -> float:
+        return min(max(self.block_time / 2, self.poll_min_interval), self.poll_max_interval)
+
+    def _observe(self, number: int, timestamp: Optional[int] = None):
+        if self.head is not None and number <= self.head:
+            return
+
+        # Block time estimate: header timestamps when we have them, wall clock otherwise
+        now = time.monotonic()
+        if self.head is not None:
+            if timestamp is not None and self._head_timestamp is not None:
+                observed = (timestamp - self._head_timestamp) / (number - self.head)
+            else:
+                observed = (now - self._head_seen_at) / (number - self.head)
+            if observed > 0:
+                self.block_time = 0.8 * self.block_time + 0.2 * observed
+
+        self.head = number
+        self._head_seen_at = now
+        self._head_timestamp = timestamp
+        self._new_head.set()
+
+    async def wait_for_head_above(self, block_number: int, timeout: float) -> Optional[int]:
+        """Wait until a head newer than ``block_number`` is seen (or ``timeout`` passes)"""
+        deadline = time.monotonic() + timeout
+        while self.head is None or self.head <= block_number:
+            self._new_head.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._new_head.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+        return self.head
+
+    async def _subscribe(self):
+        async with websockets.connect(self.ws_url, ping_interval=20, max_size=2 ** 20) as ws:
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]
+            }))
+            reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+            if reply.get('error'):
+                raise RuntimeError(reply['error'])
+
+            self.mode = "ws"
+            self.logger.info(f"📡 Subscribed to newHeads on {self.network}")
+
+            while True:
+                # A silent socket is as bad as a closed one
+                stale_after = max(30.0, self.block_time * 10)
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout=stale_after))
+                header = message.get('params', {}).get('result')
+                if header:
+                    self._observe(int(header['number'], 16), int(header['timestamp'], 16))
+
+    async def _poll(self, until: Optional[float]):
+        self.mode = "poll"
+        while until is None or time.monotonic() < until:
+            try:
+                self._observe(await self.w3.eth.block_number)
+            except Exception as e:
+                self.logger.error(f"Error polling head on {self.network}: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self):
+        """Keep ``head`` current for as long as the monitor runs"""
+        while True:
+            if self.ws_url:
+                try:
+                    await self._subscribe()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.warning(
+                        f"⚠️ newHeads subscription on {self.network} unavailable ({e}), "
+                        f"polling every {self.poll_interval:.1f}s"
+                    )
+            await self._poll(time.monotonic() + self.ws_retry_interval if self.ws_url else None)
@@ -1,16 +1,33 @@
 import asyncio
 import sys
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
+import time
+from web3 import AsyncWeb3
+from web3.middleware import async_geth_poa_middleware
 from loguru import logger
-from sqlalchemy.exc import IntegrityError
 from datetime import datetime
-from typing import Set
+from typing import List, Optional
+from sqlalchemy import delete, not_, text, update
+from sqlalchemy.schema import CreateIndex
 
 from config import get_settings
-from database import SessionLocal, Base, engine
-from models import Token
+from database import Base, engine
+from models import BlockRetry, Token, TokenRegistry
 from token_detector import TokenDetector
+from rpc import JsonRpcClient, PooledProvider, parse_endpoints
+from receipts import ReceiptFetcher
+from metadata_prober import MetadataProber
+from block_context import BlockContext
+from bytecode import BytecodeFilter
+from factory_detector import FactoryDetector
+from metrics import LatencyStats, RpcCounter
+from head_source import HeadSource
+from reorg import BlockHeader, ReorgTracker
+from rollup import RollupDeltas, ensure_rollup
+from notify import EVENT_COLUMNS, notify_tokens, token_event
+from persistence import TokenWriter
+from pipeline import BlockPipeline
+from retries import BlockRetrier
+import partitions
 
 # Configure structured logger
 logger.remove()
@@ -27,76 +44,109 @@ Base.metadata.create_all(bind=engine)
 
 
 class BlockchainMonitor:
-    def __init__(self, rpc_url: str, ws_url: str, network: str):
+    def __init__(self, rpc_url: str, ws_url: str, network: str, receipts_method: str = "auto",
+                 block_time: float = 12.0, internal_deployments: str = "auto", historical: bool = False):
         self.network = network
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        # Backfill: tokens are dated by their block instead of the time they were detected
+        self.historical = historical
+        # All HTTP RPC traffic, web3's included, goes through one endpoint pool
+        self.rpc = JsonRpcClient(
+            parse_endpoints(
+                rpc_url, rate_limit=settings.rpc_rate_limit,
+                failure_threshold=settings.rpc_failure_threshold, open_interval=settings.rpc_open_interval
+            ),
+            pool_size=settings.rpc_pool_size
+        )
+        self.w3 = AsyncWeb3(PooledProvider(self.rpc))
+        # We only read chain state; validation would add an eth_chainId per eth_call
+        self.w3.middleware_onion.remove("validation")
         
         # Use the global logger
         self.logger = logger
         
         # Inject POA middleware for BSC and other POA chains
         if network == "BSC":
-            self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
+            self.w3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
             self.logger.info(f"✅ POA middleware injected for {network}")
         
         self.detector = TokenDetector(self.w3, network, self.logger)
-        self.pending_tokens: Set[str] = set()  # Track pending confirmations
+        self.receipts = ReceiptFetcher(
+            self.rpc, network, mode=receipts_method,
+            batch_size=settings.rpc_batch_size, logger=self.logger
+        )
+        self.prober = MetadataProber(
+            self.w3, self.rpc, network, settings.multicall3_address,
+            chunk_size=settings.multicall_chunk_size, logger=self.logger
+        )
+        # Skips metadata probing for contracts whose code has no ERC-20 shape
+        self.bytecode_filter = BytecodeFilter(
+            max_entries=settings.bytecode_cache_size, calls_per_probe=len(self.prober.calls)
+        ) if settings.bytecode_prefilter else None
+        self.head_source = HeadSource(
+            self.w3, ws_url, network, block_time=block_time,
+            poll_min_interval=settings.head_poll_min_interval,
+            poll_max_interval=settings.head_poll_max_interval,
+            ws_retry_interval=settings.ws_retry_interval, logger=self.logger
+        )
+        self.reorg_tracker = ReorgTracker(network, size=settings.reorg_buffer_size)
+        self.writer = TokenWriter(
+            network, batch_size=settings.db_batch_size,
+            flush_interval=settings.db_flush_interval, logger=self.logger
+        )
         
-        self.logger.info(f"🔗 Connected to {network}: {self.w3.is_connected()}")
-    
-    def save_token_to_db(self, token_data: dict, confirmed: bool = False):
-        """Save token to database"""
-        db = SessionLocal()
-        try:
-            # Check if token already exists
-            existing = db.query(Token).filter(
-                Token.address == token_data['address'].lower(),
-                Token.network == self.network
-            ).first()
-            
-            if existing:
-                # Update confirmation status if needed
-                if confirmed and not existing.confirmed:
-                    existing.confirmed = True
-                    db.commit()
-                    self.logger.info(f"✅ Token {existing.symbol} confirmed")
-                return
-            
-            # Create new token record
-            token = Token(
-                address=token_data['address'].lower(),
-                block_number=token_data['block_number'],
-                timestamp=datetime.utcnow(),
-                network=self.network,
-                name=token_data.get('name'),
-                symbol=token_data.get('symbol'),
-                decimals=token_data.get('decimals'),
-                total_supply=token_data.get('total_supply'),
-                creator_address=token_data.get('creator_address'),
-                tx_hash=token_data.get('tx_hash'),
-                confirmed=confirmed,
-                is_verified=False,
-                risk_score=self.calculate_risk_score(token_data)
-            )
-            
-            db.add(token)
-            db.commit()
-            
-            self.logger.success(
-                f"💾 Saved token: {token.name or 'Unknown'} ({token.symbol or 'N/A'}) "
-                f"at {token.address[:10]}... on {self.network}"
-            )
+        # RPCs spent on block processing, for per-block cost reporting
+        self.rpc_stats = RpcCounter()
+        self.blocks_processed = 0
         
-        except IntegrityError:
-            db.rollback()
-            self.logger.warning(f"Token {token_data['address']} already exists in DB")
+        # Seconds from block timestamp until the block's tokens are detected
+        self.detection_latency = LatencyStats()
         
-        except Exception as e:
-            db.rollback()
-            self.logger.error(f"Error saving token: {e}")
+        # Distance to chain head; > 0 while catching up after downtime
+        self.lag_blocks = 0
+        self.catching_up = False
         
-        finally:
-            db.close()
+        # Fetch -> detect -> probe stages, committed in block order
+        self.pipeline = self.build_pipeline(settings.max_concurrent_blocks)
+        
+        # Failed blocks are queued in block_retries and retried off the live path
+        self.retrier = BlockRetrier(
+            self, limit=settings.block_retry_limit, base_delay=settings.block_retry_base_delay,
+            max_delay=settings.block_retry_max_delay, poll_interval=settings.block_retry_poll_interval,
+            concurrency=settings.block_retry_concurrency, logger=self.logger
+        )
+        
+        # Contracts created inside other transactions: from traces, or a mint log scan
+        self.factory_detector = FactoryDetector(
+            self, mode=internal_deployments, log_range=settings.log_scan_range,
+            poll_interval=settings.log_scan_interval, seen_size=settings.known_address_cache_size,
+            batch_size=settings.rpc_batch_size, confirmation_blocks=settings.confirmation_blocks,
+            logger=self.logger
+        )
+    
+    def build_token_row(self, token_data: dict, confirmed: bool = False, timestamp: Optional[datetime] = None) -> dict:
+        """Build a tokens table row for the write-behind persistence stage"""
+        return {
+            'address': token_data['address'].lower(),
+            'block_number': token_data['block_number'],
+            'timestamp': timestamp or datetime.utcnow(),
+            'network': self.network,
+            'name': self.clean_text(token_data.get('name')),
+            'symbol': self.clean_text(token_data.get('symbol')),
+            'decimals': token_data.get('decimals'),
+            'total_supply': token_data.get('total_supply'),
+            'creator_address': token_data.get('creator_address'),
+            'tx_hash': token_data.get('tx_hash'),
+            'confirmed': confirmed,
+            'is_verified': False,
+            'risk_score': self.calculate_risk_score(token_data)
+        }
+    
+    @staticmethod
+    def clean_text(value: Optional[str], max_length: int = 256) -> Optional[str]:
+        """Contract-supplied string as Postgres accepts it: no NUL characters, bounded length"""
+        if value is None:
+            return None
+        return value.replace("\x00", "")[:max_length]
     
     def calculate_risk_score(self, token_data: dict) -> int:
         """Calculate basic risk score for token"""
@@ -120,146 +170,302 @@ class BlockchainMonitor:
         
         return min(score, 10)  # Cap at 10
     
-    async def process_block(self, block_number: int):
-        """Process a single block for contract deployments"""
-        try:
-            block = self.w3.eth.get_block(block_number, full_transactions=True)
-            
-            if not block or not block.transactions:
-                return
+    async def fetch_block(self, ctx: BlockContext):
+        """Pipeline stage: the block with its transactions"""
+        ctx.block = await self.w3.eth.get_block(ctx.block_number, full_transactions=True)
+        ctx.header = BlockHeader(ctx.block_number, ctx.block.hash.hex(), ctx.block.parentHash.hex())
+    
+    async def detect_deployments(self, ctx: BlockContext):
+        """Pipeline stage: contracts created by the block's transactions that may be tokens"""
+        creation_txs = ctx.creation_transactions
+        if self.bytecode_filter:
+            # Decided from the creation input alone, before any receipt is fetched
+            creation_txs = [tx for tx in creation_txs if self.bytecode_filter.is_candidate(tx['input'])]
+        if creation_txs:
+            self.logger.info(f"📦 Processing block {ctx.block_number} ({len(ctx.transactions)} txs) on {self.network}")
             
-            self.logger.info(f"📦 Processing block {block_number} ({len(block.transactions)} txs) on {self.network}")
+            # Pull all needed receipts for the block in one round trip
+            receipts = await self.receipts.fetch(
+                ctx.block_number, [tx['hash'].hex() for tx in creation_txs]
+            )
             
-            for tx in block.transactions:
-                # Check if it's a contract creation (to address is None)
-                if tx['to'] is None:
-                    tx_hash = tx['hash'].hex()
-                    
-                    # Get contract address from receipt
-                    is_creation, contract_address = self.detector.is_contract_creation(tx_hash)
-                    
-                    if is_creation and contract_address:
-                        self.logger.info(f"🆕 New contract deployed: {contract_address}")
-                        
-                        # Try to fetch token metadata
-                        metadata = self.detector.fetch_token_metadata(contract_address)
-                        
-                        if metadata:
-                            # Get transaction details
-                            tx_details = self.detector.get_transaction_details(tx_hash)
-                            
-                            token_data = {
-                                'address': contract_address,
-                                'block_number': block_number,
-                                'name': metadata.get('name'),
-                                'symbol': metadata.get('symbol'),
-                                'decimals': metadata.get('decimals'),
-                                'total_supply': metadata.get('total_supply'),
-                                'creator_address': tx_details.get('from') if tx_details else None,
-                                'tx_hash': tx_hash
-                            }
-                            
-                            # Check if we have enough confirmations
-                            current_block = self.w3.eth.block_number
-                            is_confirmed = self.detector.is_token_confirmed(
-                                block_number, 
-                                current_block, 
-                                settings.confirmation_blocks
-                            )
-                            
-                            # Save to database
-                            self.save_token_to_db(token_data, confirmed=is_confirmed)
-                            
-                            # Track for later confirmation if not confirmed yet
-                            if not is_confirmed:
-                                self.pending_tokens.add(f"{contract_address}:{block_number}")
+            # Get contract addresses from receipts
+            for tx in creation_txs:
+                receipt = receipts.get(tx['hash'].hex().lower())
+                contract_address = receipt.get('contractAddress') if receipt else None
+                
+                if contract_address:
+                    self.logger.info(f"🆕 New contract deployed: {contract_address}")
+                    ctx.deployments.append((tx, contract_address))
         
-        except Exception as e:
-            self.logger.error(f"Error processing block {block_number}: {e}")
+        # Factory and CREATE2 deployments inside other transactions, where traces are available
+        ctx.deployments.extend(await self.factory_detector.block_deployments(ctx))
     
-    async def check_pending_confirmations(self):
-        """Check pending tokens for confirmations"""
-        if not self.pending_tokens:
+    async def probe_tokens(self, ctx: BlockContext):
+        """Pipeline stage: token metadata of the new contracts, as token rows"""
+        if not ctx.deployments:
             return
         
-        current_block = self.w3.eth.block_number
-        confirmed_tokens = set()
+        # Probe token metadata for every new contract at once
+        metadata_by_address = await self.prober.fetch_metadata(
+            [contract_address for _, contract_address in ctx.deployments]
+        )
         
-        for pending in list(self.pending_tokens):
-            address, block_num = pending.split(':')
-            block_num = int(block_num)
+        is_confirmed = self.detector.is_token_confirmed(
+            ctx.block_number,
+            ctx.head,
+            settings.confirmation_blocks
+        )
+        detected_at = datetime.utcfromtimestamp(ctx.block.timestamp) if self.historical else None
+        
+        for tx, contract_address in ctx.deployments:
+            metadata = metadata_by_address.get(contract_address)
             
-            if self.detector.is_token_confirmed(block_num, current_block, settings.confirmation_blocks):
-                # Update token as confirmed
-                db = SessionLocal()
-                try:
-                    token = db.query(Token).filter(
-                        Token.address == address.lower(),
-                        Token.network == self.network
-                    ).first()
-                    
-                    if token and not token.confirmed:
-                        token.confirmed = True
-                        db.commit()
-                        self.logger.success(f"✅ Confirmed: {token.symbol or token.address[:10]}...")
-                        confirmed_tokens.add(pending)
+            if metadata:
+                # Sender comes from the block we already have
+                token_data = {
+                    'address': contract_address,
+                    'block_number': ctx.block_number,
+                    'name': metadata.get('name'),
+                    'symbol': metadata.get('symbol'),
+                    'decimals': metadata.get('decimals'),
+                    'total_supply': metadata.get('total_supply'),
+                    'creator_address': tx['from'],
+                    'tx_hash': tx['hash'].hex()
+                }
                 
-                except Exception as e:
-                    self.logger.error(f"Error confirming token: {e}")
-                    db.rollback()
-                finally:
-                    db.close()
+                ctx.token_rows.append(self.build_token_row(token_data, is_confirmed, detected_at))
+                self.logger.info(
+                    f"🪙 Token {token_data['name'] or 'Unknown'} ({token_data['symbol'] or 'N/A'}) "
+                    f"at {contract_address[:10]}... on {self.network}"
+                )
+    
+    async def commit_block(self, ctx: BlockContext):
+        """Pipeline commit, in block order: reorg check, then hand the tokens to the writer"""
+        self.rpc_stats.update(ctx.rpc)
+        self.blocks_processed += 1
+        if ctx.block:
+            self.detection_latency.record(time.time() - ctx.block.timestamp)
+        self.logger.debug(
+            f"📊 Block {ctx.block_number} on {self.network}: {ctx.rpc.total} RPCs ({ctx.rpc.summary()})"
+        )
+        if ctx.error:
+            self.logger.error(f"Error processing block {ctx.block_number}, queued for retry: {ctx.error}")
         
-        # Remove confirmed tokens from pending
-        self.pending_tokens -= confirmed_tokens
+        # Parent-hash check in block order; on mismatch roll back and redo
+        reorg_block = self.reorg_tracker.extend(await self.missing_headers(ctx.header) + [ctx.header])
+        if reorg_block is not None:
+            if self.historical:
+                # Blocks this old cannot reorg; the rollback would delete live tokens above the range
+                await self.pipeline.abort(RuntimeError(
+                    f"Parent hash mismatch at historical block {reorg_block} on {self.network}"
+                ))
+                return
+            ancestor = await self.handle_reorg(reorg_block)
+            self.pipeline.restart(ancestor)
+            return
+        
+        if ctx.error:
+            # Written with the checkpoint that moves past this block
+            await self.writer.add_failed(ctx.block_number, ctx.error, self.retrier.next_attempt_at(1))
+        else:
+            await self.writer.add(ctx.token_rows)
+            # Their mints are skipped by the log scan
+            self.factory_detector.mark_seen(address for _, address in ctx.deployments)
+        await self.writer.mark_processed(ctx.block_number)
+    
+    async def missing_headers(self, header: Optional[BlockHeader]) -> List[BlockHeader]:
+        """Headers between the reorg tracker's tip and ``header``, left out by blocks whose fetch failed"""
+        tip = self.reorg_tracker.tip
+        if not header or not tip or header.number <= tip.number + 1:
+            return []
+        blocks = await asyncio.gather(*(self.w3.eth.get_block(number) for number in range(tip.number + 1, header.number)))
+        return [BlockHeader(block.number, block.hash.hex(), block.parentHash.hex()) for block in blocks]
+    
+    def build_pipeline(self, window: int) -> BlockPipeline:
+        return BlockPipeline(
+            self.network,
+            [
+                ("fetch", self.fetch_block, settings.fetch_concurrency),
+                ("detect", self.detect_deployments, settings.detect_concurrency),
+                ("probe", self.probe_tokens, settings.probe_concurrency),
+            ],
+            self.commit_block, window=window, queue_size=settings.pipeline_queue_size, logger=self.logger
+        )
+    
+    def confirm_tokens_in_db(self, head: int) -> int:
+        """Confirm every token of this network that is deep enough below head"""
+        stmt = (
+            update(Token)
+            .where(
+                Token.network == self.network,
+                not_(Token.confirmed),
+                Token.block_number <= head - settings.confirmation_blocks
+            )
+            .values(confirmed=True)
+            .returning(*EVENT_COLUMNS)
+        )
+        with engine.begin() as conn:
+            confirmed = conn.execute(stmt).all()
+            deltas = RollupDeltas()
+            deltas.add_confirmed(self.network, [row.timestamp for row in confirmed])
+            deltas.apply(conn)
+            notify_tokens(conn, "confirmed", [token_event(row) for row in confirmed])
+        return len(confirmed)
+    
+    async def check_pending_confirmations(self, head: int):
+        """Confirm pending tokens with one set-based UPDATE per new head"""
+        confirmed = await asyncio.to_thread(self.confirm_tokens_in_db, head)
+        if confirmed:
+            self.logger.success(f"✅ Confirmed {confirmed} token(s) on {self.network} at head {head}")
+    
+    def delete_orphaned_tokens(self, ancestor: int) -> int:
+        """Remove tokens recorded from blocks above the common ancestor"""
+        stmt = (
+            delete(Token)
+            .where(Token.network == self.network, Token.block_number > ancestor)
+            .returning(Token.id, Token.address, Token.timestamp, Token.confirmed, Token.risk_score)
+        )
+        with engine.begin() as conn:
+            removed = conn.execute(stmt).all()
+            # Free the keys so the tokens are inserted again if re-mined
+            conn.execute(delete(TokenRegistry).where(
+                TokenRegistry.network == self.network,
+                TokenRegistry.address.in_([row.address for row in removed])
+            ))
+            # Orphaned blocks are reprocessed from the canonical branch anyway
+            conn.execute(delete(BlockRetry).where(
+                BlockRetry.network == self.network, BlockRetry.block_number > ancestor
+            ))
+            deltas = RollupDeltas()
+            for _, _, timestamp, confirmed, risk_score in removed:
+                deltas.add_token(self.network, timestamp, confirmed, risk_score, sign=-1)
+            deltas.apply(conn)
+            notify_tokens(conn, "removed", [
+                {'id': token_id, 'address': address, 'network': self.network, 'confirmed': confirmed}
+                for token_id, address, _, confirmed, _ in removed
+            ])
+        
+        confirmed_removed = sum(1 for row in removed if row.confirmed)
+        if confirmed_removed:
+            self.logger.warning(
+                f"Reorg on {self.network} was deeper than {settings.confirmation_blocks} confirmations, "
+                f"removed {confirmed_removed} confirmed token(s)"
+            )
+        return len(removed)
+    
+    async def handle_reorg(self, block_number: int) -> int:
+        """Roll back to the common ancestor of a reorg detected at ``block_number``"""
+        # Walk back until our buffered hash matches the canonical chain again
+        ancestor = block_number - 1
+        while self.reorg_tracker.oldest and ancestor >= self.reorg_tracker.oldest.number:
+            canonical = await self.w3.eth.get_block(ancestor)
+            if canonical and canonical.hash.hex() == self.reorg_tracker.hash_at(ancestor):
+                break
+            ancestor -= 1
+        else:
+            self.logger.error(f"Reorg on {self.network} deeper than the {settings.reorg_buffer_size}-block buffer")
+        
+        # Orphaned rows may still sit in the write buffer; they must not reach the database
+        await self.writer.discard_above(ancestor)
+        removed = await asyncio.to_thread(self.delete_orphaned_tokens, ancestor)
+        await self.writer.reset_checkpoint(ancestor)
+        await self.factory_detector.rewind(ancestor)
+        
+        # Only once rolled back: if anything above fails, the retried commit detects the reorg again
+        self.reorg_tracker.rewind(ancestor)
+        
+        self.logger.warning(
+            f"🔀 Reorg on {self.network} at block {block_number}: common ancestor {ancestor}, "
+            f"removed {removed} token(s) from orphaned blocks, reprocessing canonical branch"
+        )
+        return ancestor
     
     async def monitor_blocks(self):
         """Monitor new blocks continuously"""
         self.logger.info(f"🚀 Starting block monitor for {self.network}")
         
         # Check if connected before starting
-        if not self.w3.is_connected():
+        connected = await self.w3.is_connected()
+        self.logger.info(f"🔗 Connected to {self.network}: {connected}")
+        if not connected:
             self.logger.error(f"❌ Cannot monitor {self.network}: Not connected to RPC")
             return
         
+        # Background flush of the write-behind token buffer and head tracking
+        self.writer_task = asyncio.create_task(self.writer.run())
+        self.head_task = asyncio.create_task(self.head_source.run())
+        self.retry_task = asyncio.create_task(self.retrier.run())
+        self.factory_task = asyncio.create_task(self.factory_detector.run())
+        
         consecutive_errors = 0
         max_consecutive_errors = 10
         
         try:
-            last_processed_block = self.w3.eth.block_number
-            self.logger.info(f"Starting from block {last_processed_block}")
+            # Resume after the last checkpointed block, or start at head on first run
+            last_processed_block = await asyncio.to_thread(self.writer.load_checkpoint)
+            if last_processed_block is None:
+                last_processed_block = await self.w3.eth.block_number
+                self.logger.info(f"No checkpoint for {self.network}, starting from block {last_processed_block}")
+            else:
+                self.logger.info(f"Resuming {self.network} from checkpoint block {last_processed_block}")
         except Exception as e:
             self.logger.error(f"❌ Cannot get initial block number for {self.network}: {e}")
             return
         
+        self.pipeline.start(last_processed_block)
+        last_head = None
+        
         while True:
             try:
                 # Reset error counter on successful operation
                 consecutive_errors = 0
                 
-                current_block = self.w3.eth.block_number
+                current_block = self.head_source.head or await self.w3.eth.block_number
+                
+                # Feed new blocks to the pipeline; submit waits while its window is full.
+                # A backlog is fed in chunks so head, stats and confirmations stay fresh.
+                target_block = min(current_block, self.pipeline.next_block + settings.catchup_chunk_size - 1)
+                while self.pipeline.next_block <= target_block:
+                    await self.pipeline.submit(current_block)
+                self.lag_blocks = current_block - self.pipeline.committed
                 
-                # Process new blocks
-                if current_block > last_processed_block:
-                    for block_num in range(last_processed_block + 1, current_block + 1):
-                        try:
-                            await self.process_block(block_num)
-                        except Exception as block_error:
-                            self.logger.error(f"Failed to process block {block_num}: {block_error}")
-                            # Continue with next block instead of crashing
-                            continue
+                if current_block != last_head:
+                    last_head = current_block
+                    if self.blocks_processed:
+                        self.logger.info(
+                            f"📊 {self.network}: {self.rpc_stats.total / self.blocks_processed:.1f} RPCs/block "
+                            f"over {self.blocks_processed} blocks ({self.rpc_stats.summary()}), "
+                            f"detection latency {self.detection_latency.summary()}, heads via {self.head_source.mode}, "
+                            f"pipeline [{self.pipeline.summary()}], endpoints [{self.rpc.summary()}]"
+                            + (f", prefilter [{self.bytecode_filter.summary()}]" if self.bytecode_filter else "")
+                            + f", factory deployments [{self.factory_detector.summary()}]"
+                        )
                     
-                    last_processed_block = current_block
+                    # Check pending confirmations once per new head
+                    try:
+                        await self.check_pending_confirmations(current_block)
+                    except Exception as confirm_error:
+                        self.logger.error(f"Error checking pending confirmations: {confirm_error}")
+                        # Continue monitoring even if confirmation check fails
+                
+                # Catch-up mode: go straight on to the next chunk
+                if self.pipeline.next_block <= current_block:
+                    if not self.catching_up:
+                        self.catching_up = True
+                        self.logger.info(f"⏩ {self.network} catching up from block {self.pipeline.committed}")
+                    self.logger.info(f"⏩ {self.network} catch-up lag: {self.lag_blocks} blocks")
+                    continue
                 
-                # Check pending confirmations
-                try:
-                    await self.check_pending_confirmations()
-                except Exception as confirm_error:
-                    self.logger.error(f"Error checking pending confirmations: {confirm_error}")
-                    # Continue monitoring even if confirmation check fails
+                if self.catching_up:
+                    self.catching_up = False
+                    self.logger.info(f"🟢 {self.network} caught up at block {self.pipeline.next_block - 1}, live tailing")
                 
-                # Wait before next check
-                await asyncio.sleep(12)  # ~12 seconds per block for ETH
+                # Wait for the next head instead of a fixed sleep. After a reorg the
+                # pipeline restarts below this block; the next head resubmits it.
+                await self.head_source.wait_for_head_above(
+                    self.pipeline.next_block - 1, timeout=settings.head_poll_max_interval * 4
+                )
             
             except Exception as e:
                 consecutive_errors += 1
@@ -276,28 +482,38 @@ class BlockchainMonitor:
                     await asyncio.sleep(wait_time)
 
 
+def migrate_token_indexes():
+    """Bring an existing tokens table to the model's indexes, then drop the ones they supersede"""
+    # create_all leaves indexes of existing tables alone, so build the replacements first
+    with engine.begin() as conn:
+        for index in Token.__table__.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+        # Single-column indexes superseded by the composite keyset pagination indexes
+        conn.execute(text("DROP INDEX IF EXISTS idx_token_timestamp, idx_token_network, idx_token_confirmed"))
+
+
 async def main():
     """Main function to run both ETH and BSC monitors"""
     logger.info("🎯 RealTime Token Scanner - Ingestor Service")
     logger.info(f"Database: {settings.database_url.split('@')[1]}")
     
+    # Partitioned layout (migrating an unpartitioned table) and this month's partitions
+    partitions.maintain()
+    migrate_token_indexes()
+    
+    # Seed the stats rollup when upgrading a database that already has tokens
+    ensure_rollup()
+    
     # Create monitors for both networks
-    eth_monitor = BlockchainMonitor(
-        settings.eth_rpc_url,
-        settings.eth_ws_url,
-        "ETH"
-    )
+    eth_monitor = BlockchainMonitor(network="ETH", **settings.rpc_config("ETH"))
     
-    bsc_monitor = BlockchainMonitor(
-        settings.bsc_rpc_url,
-        settings.bsc_ws_url,
-        "BSC"
-    )
+    bsc_monitor = BlockchainMonitor(network="BSC", **settings.rpc_config("BSC"))
     
     # Run both monitors concurrently
     await asyncio.gather(
         eth_monitor.monitor_blocks(),
-        bsc_monitor.monitor_blocks()
+        bsc_monitor.monitor_blocks(),
+        partitions.run_maintenance()
     )
 
 
@@ -0,0 +1,141 @@
+import asyncio
+from typing import Dict, List, Optional
+from web3 import AsyncWeb3
+from loguru import logger as global_logger
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from abi import ERC20_ABI, MULTICALL3_ABI
+from rpc import JsonRpcClient, RpcError
+
+
+# ERC20 view functions probed for every contract, mapped to metadata keys
+METADATA_FIELDS = {
+    'name': 'name',
+    'symbol': 'symbol',
+    'decimals': 'decimals',
+    'totalSupply': 'total_supply',
+}
+
+
+class MetadataProber:
+    """Fetch ERC20 metadata for many contracts with a handful of RPCs.
+
+    All four view calls of every contract are packed into Multicall3
+    ``tryAggregate(false, ...)`` so a reverting contract only fails its own
+    entries. Chains without Multicall3 fall back to one JSON-RPC batch of
+    plain ``eth_call`` requests. So does a chunk whose aggregate call fails:
+    sub-calls share the call's gas, so one contract that burns it all (or
+    returns a huge payload) fails the whole aggregate, while a separate
+    ``eth_call`` per view function confines it to its own entries.
+    """
+
+    def __init__(self, w3: AsyncWeb3, client: JsonRpcClient, network: str,
+                 multicall_address: str, chunk_size: int = 50, logger=None):
+        self.w3 = w3
+        self.client = client
+        self.network = network
+        self.chunk_size = chunk_size
+        self.logger = logger or global_logger
+        self.multicall_available: Optional[bool] = None
+
+        self.erc20 = w3.eth.contract(abi=ERC20_ABI)
+        self.multicall = w3.eth.contract(
+            address=AsyncWeb3.to_checksum_address(multicall_address),
+            abi=MULTICALL3_ABI
+        )
+
+        # Pre-encode selectors and output types once
+        outputs = {item['name']: [o['type'] for o in item['outputs']] for item in ERC20_ABI}
+        self.calls = [
+            (fn_name, self.erc20.encodeABI(fn_name=fn_name), outputs[fn_name])
+            for fn_name in METADATA_FIELDS
+        ]
+
+    async def _check_multicall(self) -> bool:
+        if self.multicall_available is None:
+            try:
+                code = await self.w3.eth.get_code(self.multicall.address)
+                self.multicall_available = len(code) > 0
+            except Exception as e:
+                self.logger.error(f"Error checking Multicall3 on {self.network}: {e}")
+                return False
+
+            if not self.multicall_available:
+                self.logger.info(f"Multicall3 not deployed on {self.network}, using batched eth_call")
+        return self.multicall_available
+
+    def _decode(self, output_types: List[str], success: bool, data) -> Optional[object]:
+        if not success or not data:
+            return None
+        try:
+            return self.w3.codec.decode(output_types, bytes(data))[0]
+        except Exception:
+            # e.g. bytes32 name/symbol or garbage from a non-token fallback()
+            return None
+
+    async def _try_aggregate(self, addresses: List[str]) -> List[tuple]:
+        calls = [
+            (AsyncWeb3.to_checksum_address(address), calldata)
+            for address in addresses
+            for _, calldata, _ in self.calls
+        ]
+        return await self.multicall.functions.tryAggregate(False, calls).call()
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10))
+    async def _batch_eth_call(self, addresses: List[str]) -> List[tuple]:
+        requests = [
+            ("eth_call", [{"to": address, "data": calldata}, "latest"])
+            for address in addresses
+            for _, calldata, _ in self.calls
+        ]
+        results = await self.client.batch(requests)
+        return [
+            (False, b"") if isinstance(result, RpcError) or not result else (True, bytes.fromhex(result[2:]))
+            for result in results
+        ]
+
+    async def _probe_chunk(self, addresses: List[str], use_multicall: bool) -> Dict[str, Optional[Dict]]:
+        # Errors propagate: reporting the contracts as non-tokens would lose them for good
+        results = None
+        if use_multicall:
+            try:
+                results = await self._try_aggregate(addresses)
+            except Exception as e:
+                self.logger.warning(
+                    f"tryAggregate over {len(addresses)} contract(s) on {self.network} failed, "
+                    f"probing them with separate calls: {e}"
+                )
+        if results is None:
+            results = await self._batch_eth_call(addresses)
+
+        probed = {}
+        per_contract = len(self.calls)
+        for i, address in enumerate(addresses):
+            metadata = {}
+            for (fn_name, _, output_types), (success, data) in zip(
+                self.calls, results[i * per_contract:(i + 1) * per_contract]
+            ):
+                metadata[METADATA_FIELDS[fn_name]] = self._decode(output_types, success, data)
+
+            # If we got at least symbol or name, consider it a token
+            if metadata.get('symbol') or metadata.get('name'):
+                self.logger.info(f"✅ Token detected: {metadata.get('name', 'Unknown')} ({metadata.get('symbol', 'N/A')})")
+                probed[address] = metadata
+            else:
+                self.logger.debug(f"Contract {address} is not a standard ERC20 token")
+                probed[address] = None
+        return probed
+
+    async def fetch_metadata(self, addresses: List[str]) -> Dict[str, Optional[Dict]]:
+        """Return ERC20 metadata (or None for non-tokens) for each address"""
+        if not addresses:
+            return {}
+
+        use_multicall = await self._check_multicall()
+        chunks = [addresses[i:i + self.chunk_size] for i in range(0, len(addresses), self.chunk_size)]
+        results = await asyncio.gather(*(self._probe_chunk(chunk, use_multicall) for chunk in chunks))
+
+        metadata = {}
+        for chunk_result in results:
+            metadata.update(chunk_result)
+        return metadata
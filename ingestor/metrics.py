@@ -0,0 +1,69 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RpcCounter(Counter):
+    """Count RPC round trips by method name"""
+
+    def record(self, method: str, n: int = 1):
+        self[method] += n
+
+    @property
+    def total(self) -> int:
+        return sum(self.values())
+
+    def summary(self) -> str:
+        return ", ".join(f"{method}={count}" for method, count in sorted(self.items()))
+
+
+class LatencyStats:
+    """Running latency figures (seconds) with an exponential moving average"""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.count = 0
+        self.last: Optional[float] = None
+        self.avg: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.last = seconds
+        self.avg = seconds if self.avg is None else (1 - self.alpha) * self.avg + self.alpha * seconds
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def summary(self) -> str:
+        if not self.count:
+            return "n/a"
+        return f"last={self.last:.1f}s avg={self.avg:.1f}s max={self.max:.1f}s"
+
+
+class RateMeter:
+    """Events per second between consecutive readings"""
+
+    def __init__(self):
+        self.count = 0
+        self._last_read = (time.monotonic(), 0)
+
+    def add(self, n: int = 1):
+        self.count += n
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        since, count = self._last_read
+        self._last_read = (now, self.count)
+        return (self.count - count) / max(now - since, 1e-9)
+
+
+# Counter of the block currently being processed. Every asyncio task gets its
+# own copy of the context, so concurrently processed blocks don't mix counts.
+current_rpc_counter: ContextVar[Optional[RpcCounter]] = ContextVar("current_rpc_counter", default=None)
+
+
+def record_rpc(method: str):
+    counter = current_rpc_counter.get()
+    if counter is not None:
+        counter.record(method)
+
@@ -1,15 +1,21 @@
 from sqlalchemy import Column, Integer, String, BigInteger, Boolean, TIMESTAMP, Numeric, Text, Index
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from database import Base
 
 
 class Token(Base):
+    """Detected tokens, range-partitioned by month on ``timestamp``.
+
+    Postgres only enforces unique indexes on a partitioned table when they
+    include the partition key, so ``(address, network)`` uniqueness lives
+    in ``token_registry``.
+    """
     __tablename__ = "tokens"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     address = Column(Text, nullable=False)
     block_number = Column(BigInteger, nullable=False)
-    timestamp = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    timestamp = Column(TIMESTAMP, primary_key=True, nullable=False, server_default=func.now())
     network = Column(String(10), nullable=False)
     
     # Token metadata
@@ -26,10 +32,80 @@ class Token(Base):
     risk_score = Column(Integer, default=0)
     
     __table_args__ = (
-        Index('idx_token_addr_network', 'address', 'network', unique=True),
-        Index('idx_token_timestamp', 'timestamp'),
-        Index('idx_token_network', 'network'),
-        Index('idx_token_confirmed', 'confirmed'),
+        Index('idx_token_addr_network', 'address', 'network'),
+        # Keyset pagination indexes, one per /tokens/new filter combination;
+        # scanned backwards for ORDER BY timestamp DESC, id DESC
+        Index('idx_token_ts_id', 'timestamp', 'id'),
+        Index('idx_token_network_ts_id', 'network', 'timestamp', 'id'),
+        Index('idx_token_confirmed_ts_id', 'confirmed', 'timestamp', 'id'),
+        Index('idx_token_network_confirmed_ts_id', 'network', 'confirmed', 'timestamp', 'id'),
+        # Partial index for the confirmation sweeper: only rows still waiting
+        Index('idx_token_unconfirmed', 'network', 'block_number', postgresql_where=text('NOT confirmed')),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
     )
 
 
+class TokenRegistry(Base):
+    """One row per known (address, network), pointing at the token's partition"""
+    __tablename__ = "token_registry"
+    
+    address = Column(Text, primary_key=True)
+    network = Column(String(10), primary_key=True)
+    timestamp = Column(TIMESTAMP, nullable=False)
+
+
+class TokenStatsHourly(Base):
+    """Token counts per network per hour, maintained by the ingestor alongside token writes"""
+    __tablename__ = "token_stats_hourly"
+    
+    network = Column(String(10), primary_key=True)
+    hour = Column(TIMESTAMP, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    confirmed_count = Column(BigInteger, nullable=False, default=0)
+    high_risk_count = Column(BigInteger, nullable=False, default=0)
+
+
+class Checkpoint(Base):
+    """Last fully processed block per network, written with that block's tokens"""
+    __tablename__ = "ingestor_checkpoints"
+    
+    network = Column(String(10), primary_key=True)
+    block_number = Column(BigInteger, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+
+
+class BlockRetry(Base):
+    """Block that failed processing, retried with backoff; ``dead`` once the retry limit is spent"""
+    __tablename__ = "block_retries"
+    
+    network = Column(String(10), primary_key=True)
+    block_number = Column(BigInteger, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=1)
+    next_attempt_at = Column(TIMESTAMP, nullable=False)
+    last_error = Column(Text, nullable=True)
+    dead = Column(Boolean, nullable=False, default=False)
+    created_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # Due entries of a network, polled by the retry worker
+        Index('idx_block_retry_due', 'network', 'next_attempt_at', postgresql_where=text('NOT dead')),
+    )
+
+
+class BackfillShard(Base):
+    """Progress of one block range of a historical backfill"""
+    __tablename__ = "backfill_shards"
+    
+    id = Column(Integer, primary_key=True)
+    network = Column(String(10), nullable=False)
+    start_block = Column(BigInteger, nullable=False)
+    end_block = Column(BigInteger, nullable=False)
+    next_block = Column(BigInteger, nullable=False)
+    completed = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('idx_backfill_shard_range', 'network', 'start_block', 'end_block', unique=True),
+    )
+
@@ -0,0 +1,61 @@
+"""Token change events published to the API over Postgres LISTEN/NOTIFY.
+
+Notifications are issued inside the transaction that writes the tokens, so
+listeners only hear about committed rows. Payloads are JSON objects of the
+form ``{"type": "new" | "confirmed" | "removed", "tokens": [...]}``; the
+tokens of one write are split over as many notifications as needed to stay
+below the server's 8000 byte payload limit.
+"""
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, List
+
+from sqlalchemy import func, select
+
+from models import Token
+
+TOKEN_CHANNEL = "token_events"
+MAX_PAYLOAD_BYTES = 7900
+
+# Columns sent for new and confirmed tokens, in TokenResponse field names
+EVENT_COLUMNS = [
+    Token.id, Token.address, Token.block_number, Token.timestamp, Token.network,
+    Token.name, Token.symbol, Token.decimals, Token.total_supply,
+    Token.creator_address, Token.tx_hash, Token.confirmed, Token.is_verified, Token.risk_score,
+]
+
+
+def token_event(row) -> dict:
+    """Serialize a row that includes ``EVENT_COLUMNS``"""
+    event = {column.key: getattr(row, column.key) for column in EVENT_COLUMNS}
+    if isinstance(event.get('timestamp'), datetime):
+        event['timestamp'] = event['timestamp'].isoformat()
+    if isinstance(event.get('total_supply'), Decimal):
+        event['total_supply'] = str(event['total_supply'])
+    return event
+
+
+def _payloads(event_type: str, tokens: List[dict]) -> Iterable[str]:
+    chunk: List[str] = []
+    size = 0
+    for token in tokens:
+        encoded = json.dumps(token, separators=(',', ':'))
+        if len(encoded) > MAX_PAYLOAD_BYTES:
+            # Contract-controlled strings can be arbitrarily long
+            token = {**token, 'name': token['name'] and token['name'][:64],
+                     'symbol': token['symbol'] and token['symbol'][:32]}
+            encoded = json.dumps(token, separators=(',', ':'))
+        if chunk and size + len(encoded) + 1 > MAX_PAYLOAD_BYTES:
+            yield f'{{"type":"{event_type}","tokens":[{",".join(chunk)}]}}'
+            chunk, size = [], 0
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        yield f'{{"type":"{event_type}","tokens":[{",".join(chunk)}]}}'
+
+
+def notify_tokens(conn, event_type: str, tokens: List[dict]):
+    """Queue notifications for ``tokens``; delivered when ``conn`` commits"""
+    for payload in _payloads(event_type, tokens):
+        conn.execute(select(func.pg_notify(TOKEN_CHANNEL, payload)))
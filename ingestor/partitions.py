@@ -0,0 +1,181 @@
+"""Monthly range partitions of the tokens table.
+
+Partitions are named ``tokens_pYYYYMM`` and cover one calendar month of
+``timestamp``. Maintenance keeps ``partition_months_ahead`` future months
+created and archives months older than ``token_retention_months``: the
+partition is detached, exported to ``<archive_dir>/tokens_pYYYYMM.csv.gz``
+and dropped, instead of deleting its rows one by one. The months' rows of
+``token_stats_hourly`` are deleted when the partitions are detached.
+Archived addresses stay in ``token_registry`` so they are not detected again.
+
+Run ``python partitions.py`` for a one-off maintenance pass.
+"""
+import asyncio
+import gzip
+import os
+import re
+from datetime import datetime
+from typing import List
+
+from loguru import logger
+from sqlalchemy import delete, text
+
+from config import get_settings
+from database import Base, engine
+from models import Token, TokenStatsHourly
+
+settings = get_settings()
+
+PARTITION_NAME = re.compile(r"^tokens_p(\d{4})(\d{2})$")
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"tokens_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> datetime:
+    match = PARTITION_NAME.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('tokens')"
+    )).scalar() is True
+
+
+def attached_partitions(conn) -> List[str]:
+    return sorted(conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'tokens'::regclass
+    """)).scalars())
+
+
+def detached_partitions(conn) -> List[str]:
+    """Partitions detached by an archive run that did not finish its export"""
+    return sorted(name for name in conn.execute(text("""
+        SELECT c.relname FROM pg_class c
+        WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace
+          AND c.relname LIKE 'tokens\\_p%'
+          AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)
+    """)).scalars() if PARTITION_NAME.match(name))
+
+
+def create_partition(conn, month: datetime):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF tokens "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(conn, since: datetime = None):
+    """Create the partitions from ``since`` (default: this month) through the months ahead"""
+    month = month_start(since or datetime.utcnow())
+    last = add_months(month_start(datetime.utcnow()), settings.partition_months_ahead)
+    while month <= last:
+        create_partition(conn, month)
+        month = add_months(month, 1)
+
+
+def migrate_unpartitioned(conn):
+    """Move a pre-partitioning tokens heap into the partitioned layout, in one transaction"""
+    logger.info("📦 Converting tokens to a partitioned table")
+    conn.execute(text("LOCK TABLE tokens IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER TABLE tokens RENAME TO tokens_unpartitioned"))
+    conn.execute(text("ALTER TABLE tokens_unpartitioned RENAME CONSTRAINT tokens_pkey TO tokens_unpartitioned_pkey"))
+    conn.execute(text("ALTER SEQUENCE tokens_id_seq RENAME TO tokens_unpartitioned_id_seq"))
+    for index in ["ix_tokens_id", *(index.name for index in Token.__table__.indexes)]:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    Token.__table__.create(conn)
+    oldest = conn.execute(text("SELECT min(timestamp) FROM tokens_unpartitioned")).scalar()
+    ensure_partitions(conn, since=oldest)
+
+    columns = ", ".join(column.name for column in Token.__table__.columns)
+    conn.execute(text(f"INSERT INTO tokens ({columns}) SELECT {columns} FROM tokens_unpartitioned"))
+    conn.execute(text(
+        "INSERT INTO token_registry (address, network, timestamp) "
+        "SELECT address, network, timestamp FROM tokens_unpartitioned ON CONFLICT DO NOTHING"
+    ))
+    conn.execute(text(
+        "SELECT setval(pg_get_serial_sequence('tokens', 'id'), "
+        "(SELECT coalesce(max(id), 0) + 1 FROM tokens_unpartitioned), false)"
+    ))
+    conn.execute(text("DROP TABLE tokens_unpartitioned"))
+
+
+def export_partition(name: str) -> str:
+    """Write a detached partition to ``<archive_dir>/<name>.csv.gz``"""
+    os.makedirs(settings.archive_dir, exist_ok=True)
+    path = os.path.join(settings.archive_dir, f"{name}.csv.gz")
+    partial = path + ".partial"
+
+    raw = engine.raw_connection()
+    try:
+        with open(partial, "wb") as file:
+            with gzip.GzipFile(fileobj=file, mode="wb") as archive:
+                raw.cursor().copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", archive)
+            # The partition is dropped next, so the archive must be on disk
+            file.flush()
+            os.fsync(file.fileno())
+    finally:
+        raw.close()
+    os.replace(partial, path)
+    return path
+
+
+def archive_expired():
+    """Detach, export and drop every partition past the retention period"""
+    if settings.token_retention_months <= 0:
+        return
+    cutoff = add_months(month_start(datetime.utcnow()), -settings.token_retention_months)
+
+    with engine.begin() as conn:
+        expired = [name for name in attached_partitions(conn) if partition_month(name) < cutoff]
+        for name in expired:
+            conn.execute(text(f"ALTER TABLE tokens DETACH PARTITION {name}"))
+        # Every token before the cutoff was in an expired partition; the rollup must not keep counting them
+        conn.execute(delete(TokenStatsHourly).where(TokenStatsHourly.hour < cutoff))
+
+    with engine.connect() as conn:
+        pending = detached_partitions(conn)
+
+    for name in pending:
+        path = export_partition(name)
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {name}"))
+        logger.success(f"📦 Archived {name} to {path}")
+
+
+def maintain():
+    """Bring the tokens table to the partitioned layout and the partition set up to date"""
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            migrate_unpartitioned(conn)
+        ensure_partitions(conn)
+    archive_expired()
+
+
+async def run_maintenance():
+    """Repeat ``maintain`` so next months' partitions exist before rows arrive"""
+    while True:
+        await asyncio.sleep(settings.partition_maintenance_interval)
+        try:
+            await asyncio.to_thread(maintain)
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {e}")
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    maintain()
+    logger.success("📦 Token partitions up to date")
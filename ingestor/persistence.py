@@ -0,0 +1,274 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from loguru import logger as global_logger
+from sqlalchemy import delete, func, not_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from database import engine
+from models import BlockRetry, Checkpoint, Token, TokenRegistry
+from notify import EVENT_COLUMNS, notify_tokens, token_event
+from rollup import RollupDeltas
+
+
+class TokenWriter:
+    """Write-behind buffer for token rows.
+
+    Rows are collected per block and written in one transaction once
+    ``batch_size`` rows are queued or ``flush_interval`` seconds have passed
+    since the oldest queued row: one multi-row insert into ``token_registry``
+    claims the new ``(address, network)`` keys, one insert adds their tokens
+    and one update confirms known tokens that have become confirmed.
+
+    The network checkpoint (last fully processed block) is written in the
+    same transaction as the rows, so it never gets ahead of the tokens of
+    the blocks it covers. Blocks that failed are queued in ``block_retries``
+    by that same transaction, so the checkpoint never passes a block that is
+    neither written nor queued for retry. Inserted and newly confirmed
+    tokens are announced to the API with NOTIFY on commit, unless ``publish``
+    is off.
+
+    If the database rejects a batch for its data rather than an outage,
+    the batch is split until the offending rows are isolated; those are
+    logged and dropped so they cannot hold back the rest and the checkpoint.
+    """
+
+    publish = True
+
+    def __init__(self, network: str, batch_size: int = 500, flush_interval: float = 1.0, logger=None):
+        self.network = network
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.logger = logger or global_logger
+        self.buffer: List[dict] = []
+        self.checkpoint: Optional[int] = None
+        # block number -> block_retries row, and retried blocks to drop from the queue
+        self.failed: Dict[int, dict] = {}
+        self.resolved: Set[int] = set()
+        self.tokens_written = 0
+        self.tokens_rejected = 0
+        self.oldest_queued_at = None
+        self.lock = asyncio.Lock()
+
+    async def add(self, rows: List[dict]):
+        """Queue all token rows of one block"""
+        if not rows:
+            return
+        if not self.buffer:
+            self.oldest_queued_at = time.monotonic()
+        self.buffer.extend(rows)
+
+        if len(self.buffer) >= self.batch_size:
+            await self.flush()
+
+    def _touch(self):
+        if self.oldest_queued_at is None:
+            self.oldest_queued_at = time.monotonic()
+
+    async def add_failed(self, block_number: int, error: Exception, retry_at: datetime):
+        """Queue a block whose processing failed for the retry worker"""
+        self._touch()
+        self.resolved.discard(block_number)
+        self.failed[block_number] = {
+            'network': self.network, 'block_number': block_number, 'attempts': 1,
+            'next_attempt_at': retry_at, 'last_error': f"{type(error).__name__}: {error}"[:1000], 'dead': False
+        }
+
+    async def resolve_retry(self, block_number: int):
+        """Drop a block from the retry queue once its tokens, queued before, are written"""
+        self._touch()
+        self.failed.pop(block_number, None)
+        self.resolved.add(block_number)
+
+    async def mark_processed(self, block_number: int):
+        """Record that every block up to ``block_number`` has been queued"""
+        self._touch()
+        self.checkpoint = max(self.checkpoint or 0, block_number)
+
+    async def discard_above(self, block_number: int):
+        """Drop queued rows and retry entries of blocks above ``block_number``, e.g. orphaned by a reorg"""
+        # Taking the lock lets a flush already in progress finish first
+        async with self.lock:
+            self.buffer = [row for row in self.buffer if row['block_number'] <= block_number]
+            self.failed = {number: entry for number, entry in self.failed.items() if number <= block_number}
+            if self.checkpoint is not None:
+                self.checkpoint = min(self.checkpoint, block_number)
+
+    async def reset_checkpoint(self, block_number: int):
+        """Move the checkpoint back, e.g. to the common ancestor of a reorg"""
+        async with self.lock:
+            self.checkpoint = block_number
+            self.oldest_queued_at = self.oldest_queued_at or time.monotonic()
+
+    @property
+    def checkpoint_key(self) -> str:
+        """Row of ``ingestor_checkpoints`` this writer advances"""
+        return self.network
+
+    def load_checkpoint(self) -> Optional[int]:
+        """Return the last persisted block for this network, if any"""
+        with engine.connect() as conn:
+            return conn.execute(
+                select(Checkpoint.block_number).where(Checkpoint.network == self.checkpoint_key)
+            ).scalar()
+
+    @staticmethod
+    def _dedupe(rows: List[dict]) -> List[dict]:
+        # Postgres rejects a statement that touches the same conflict key twice
+        merged: Dict[Tuple[str, str], dict] = {}
+        for row in rows:
+            key = (row['address'], row['network'])
+            if key in merged:
+                row = {**merged[key], 'confirmed': merged[key]['confirmed'] or row['confirmed']}
+            merged[key] = row
+        return list(merged.values())
+
+    def _write(self, rows: List[dict], checkpoint: Optional[int], failed: List[dict], resolved: Set[int]):
+        with engine.begin() as conn:
+            if rows:
+                # token_registry enforces (address, network) uniqueness across
+                # partitions; only rows that claim a new key are inserted
+                claimed = set(conn.execute(
+                    insert(TokenRegistry)
+                    .values([
+                        {'address': row['address'], 'network': row['network'], 'timestamp': row['timestamp']}
+                        for row in rows
+                    ])
+                    .on_conflict_do_nothing()
+                    .returning(TokenRegistry.address, TokenRegistry.network)
+                ).all())
+                new_rows = [row for row in rows if (row['address'], row['network']) in claimed]
+                confirmed_keys = [
+                    (row['address'], row['network']) for row in rows
+                    if row['confirmed'] and (row['address'], row['network']) not in claimed
+                ]
+
+                inserted = []
+                if new_rows:
+                    inserted = conn.execute(insert(Token).values(new_rows).returning(*EVENT_COLUMNS)).all()
+
+                # Known tokens are only touched when they become confirmed; the
+                # registry's timestamp prunes the update to one partition each
+                confirmed = []
+                if confirmed_keys:
+                    confirmed = conn.execute(
+                        update(Token)
+                        .where(
+                            Token.address == TokenRegistry.address,
+                            Token.network == TokenRegistry.network,
+                            Token.timestamp == TokenRegistry.timestamp,
+                            tuple_(TokenRegistry.address, TokenRegistry.network).in_(confirmed_keys),
+                            not_(Token.confirmed)
+                        )
+                        .values(confirmed=True)
+                        .returning(*EVENT_COLUMNS)
+                    ).all()
+
+                # Keep the hourly rollup in step within the same transaction
+                deltas = RollupDeltas()
+                for row in inserted:
+                    deltas.add_token(self.network, row.timestamp, row.confirmed, row.risk_score)
+                deltas.add_confirmed(self.network, [row.timestamp for row in confirmed])
+                deltas.apply(conn)
+                if self.publish:
+                    notify_tokens(conn, "new", [token_event(row) for row in inserted])
+                    notify_tokens(conn, "confirmed", [token_event(row) for row in confirmed])
+
+            if failed:
+                stmt = insert(BlockRetry).values(failed)
+                conn.execute(stmt.on_conflict_do_update(
+                    index_elements=[BlockRetry.network, BlockRetry.block_number],
+                    set_={'last_error': stmt.excluded.last_error, 'updated_at': func.now()}
+                ))
+            if resolved:
+                conn.execute(delete(BlockRetry).where(
+                    BlockRetry.network == self.network, BlockRetry.block_number.in_(resolved)
+                ))
+
+            if checkpoint is not None:
+                self._write_checkpoint(conn, checkpoint)
+
+    def _write_checkpoint(self, conn, checkpoint: int):
+        stmt = insert(Checkpoint).values(network=self.checkpoint_key, block_number=checkpoint)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Checkpoint.network],
+            set_={'block_number': stmt.excluded.block_number, 'updated_at': func.now()}
+        )
+        conn.execute(stmt)
+
+    @staticmethod
+    def _is_outage(error: Exception) -> bool:
+        # Connection-level failures say nothing about the rows; anything else may be a rejected row
+        return isinstance(error, (OperationalError, InterfaceError))
+
+    def _write_isolating(self, rows: List[dict]) -> List[dict]:
+        """Write ``rows`` in ever smaller transactions around rejected ones; returns the rejected rows"""
+        if not rows:
+            return []
+        try:
+            self._write(rows, None, [], set())
+            return []
+        except Exception as e:
+            if self._is_outage(e):
+                raise
+            if len(rows) == 1:
+                self.logger.error(
+                    f"Dropping token {rows[0]['address']} on {self.network} (block {rows[0]['block_number']}), "
+                    f"rejected by the database: {e}"
+                )
+                return rows
+        middle = len(rows) // 2
+        return self._write_isolating(rows[:middle]) + self._write_isolating(rows[middle:])
+
+    def _write_batch(self, rows: List[dict], checkpoint: Optional[int], failed: List[dict],
+                     resolved: Set[int]) -> int:
+        """Write everything in one transaction, isolating rejected rows if needed; returns rows rejected"""
+        try:
+            self._write(rows, checkpoint, failed, resolved)
+            return 0
+        except Exception as e:
+            if not rows or self._is_outage(e):
+                raise
+            self.logger.warning(f"Batch of {len(rows)} token(s) on {self.network} rejected, isolating bad rows: {e}")
+        middle = len(rows) // 2
+        rejected = self._write_isolating(rows[:middle]) + self._write_isolating(rows[middle:])
+        self._write([], checkpoint, failed, resolved)
+        return len(rejected)
+
+    async def flush(self) -> bool:
+        """Write all queued rows in one round trip and one commit; returns False if it must be retried"""
+        async with self.lock:
+            if not self.buffer and self.checkpoint is None and not self.failed and not self.resolved:
+                return True
+
+            rows, self.buffer = self._dedupe(self.buffer), []
+            checkpoint, self.checkpoint = self.checkpoint, None
+            failed, self.failed = self.failed, {}
+            resolved, self.resolved = self.resolved, set()
+            self.oldest_queued_at = None
+            try:
+                rejected = await asyncio.to_thread(self._write_batch, rows, checkpoint, list(failed.values()), resolved)
+                self.tokens_written += len(rows) - rejected
+                self.tokens_rejected += rejected
+                if len(rows) > rejected:
+                    self.logger.success(f"💾 Saved {len(rows) - rejected} token(s) on {self.network}")
+                return True
+            except Exception as e:
+                self.logger.error(f"Error saving {len(rows)} token(s) on {self.network}: {e}")
+                # Keep rows, checkpoint and retry queue changes for the next flush
+                self.buffer = rows + self.buffer
+                if checkpoint is not None:
+                    self.checkpoint = max(self.checkpoint or 0, checkpoint)
+                self.failed = {**failed, **self.failed}
+                self.resolved |= resolved - self.failed.keys()
+                self.oldest_queued_at = time.monotonic()
+                return False
+
+    async def run(self):
+        """Flush the buffer whenever its oldest row reaches ``flush_interval``"""
+        while True:
+            await asyncio.sleep(self.flush_interval / 2)
+            if self.oldest_queued_at and time.monotonic() - self.oldest_queued_at >= self.flush_interval:
+                await self.flush()
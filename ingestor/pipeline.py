@@ -0,0 +1,192 @@
+"""Staged block processing with ordered commit.
+
+Blocks move through a chain of stages (fetch, detect, probe), each with its
+own number of workers and a bounded input queue, so a slow stage backs up
+into the one before it instead of piling work up in memory. Finished blocks
+wait in a reorder buffer and are committed strictly in block order, which
+keeps reorg checks and the checkpoint correct however the stages interleave.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger as global_logger
+
+from block_context import BlockContext
+from metrics import RateMeter, current_rpc_counter
+
+Handler = Callable[[BlockContext], Awaitable[None]]
+
+
+class PipelineStage:
+    """The workers of one stage and the bounded queue that feeds them"""
+
+    def __init__(self, name: str, handler: Handler, concurrency: int, queue_size: int):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.busy = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.throughput = RateMeter()
+
+    def summary(self) -> str:
+        processed = self.throughput.count
+        avg_ms = self.busy_seconds / processed * 1000 if processed else 0.0
+        return (
+            f"{self.name} q={self.queue.qsize()}/{self.queue.maxsize} busy={self.busy}/{self.concurrency} "
+            f"{self.throughput.rate():.1f}/s avg={avg_ms:.0f}ms"
+        )
+
+
+class BlockPipeline:
+    """Run blocks of one network through ``stages`` and hand them to ``commit`` in order.
+
+    ``window`` bounds the blocks in flight, queued, running or waiting for
+    commit; ``submit`` blocks while it is full. A stage that raises records
+    the exception on ``BlockContext.error`` and the remaining stages are
+    skipped, so ``commit`` sees every submitted block exactly once.
+    """
+
+    def __init__(self, network: str, stages: Sequence[Tuple[str, Handler, int]], commit: Handler,
+                 window: int = 32, queue_size: int = 16, logger=None):
+        self.network = network
+        self.stages = [PipelineStage(name, handler, concurrency, queue_size) for name, handler, concurrency in stages]
+        self.commit = commit
+        self.window_size = window
+        self.window = asyncio.Semaphore(window)
+        self.in_flight = 0
+        self.logger = logger or global_logger
+
+        self.next_block: Optional[int] = None  # next block to submit
+        self.committed: Optional[int] = None  # last block handed to ``commit``
+        self.pending: Dict[int, BlockContext] = {}
+        self.commits = RateMeter()
+        # Set by ``abort``; nothing is committed after it
+        self.error: Optional[Exception] = None
+        # Bumped by ``restart``; blocks of an older epoch are dropped wherever they are
+        self.epoch = 0
+        self._ready = asyncio.Event()
+        self._progress = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, last_committed: int):
+        """Start the workers; the first block submitted is ``last_committed + 1``"""
+        self.committed = last_committed
+        self.next_block = last_committed + 1
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            self._tasks.extend(
+                asyncio.create_task(self._work(stage, next_stage)) for _ in range(stage.concurrency)
+            )
+        self._tasks.append(asyncio.create_task(self._commit_in_order()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, head: int) -> int:
+        """Queue the next block, waiting while the window is full; returns its number"""
+        await self.window.acquire()
+        self.in_flight += 1
+        ctx = BlockContext(self.network, self.next_block, None, head)
+        self.next_block += 1
+        await self.stages[0].queue.put((self.epoch, ctx))
+        return ctx.block_number
+
+    def restart(self, last_committed: int):
+        """Discard every block above ``last_committed`` and continue after it, e.g. after a reorg"""
+        self.epoch += 1
+        for stage in self.stages:
+            while not stage.queue.empty():
+                stage.queue.get_nowait()
+                self._release()
+        for _ in self.pending:
+            self._release()
+        self.pending.clear()
+        # Blocks a worker is running right now are dropped when it finishes them
+        self.committed = last_committed
+        self.next_block = last_committed + 1
+
+    async def wait_committed(self, block_number: int):
+        """Return once every block up to ``block_number`` has been committed; raises if aborted"""
+        async with self._progress:
+            await self._progress.wait_for(lambda: self.error is not None or self.committed >= block_number)
+        if self.error is not None:
+            raise self.error
+
+    async def abort(self, error: Exception):
+        """Stop committing for good and make ``wait_committed`` raise ``error``"""
+        self.error = error
+        async with self._progress:
+            self._progress.notify_all()
+
+    def _release(self):
+        self.in_flight -= 1
+        self.window.release()
+
+    async def _work(self, stage: PipelineStage, next_stage: Optional[PipelineStage]):
+        while True:
+            epoch, ctx = await stage.queue.get()
+            if epoch == self.epoch and ctx.error is None:
+                stage.busy += 1
+                started = time.monotonic()
+                # RPCs made by the handler are counted on the block
+                counter_token = current_rpc_counter.set(ctx.rpc)
+                try:
+                    await stage.handler(ctx)
+                except Exception as e:
+                    stage.failed += 1
+                    ctx.error = e
+                finally:
+                    current_rpc_counter.reset(counter_token)
+                    stage.busy -= 1
+                    stage.busy_seconds += time.monotonic() - started
+                    stage.throughput.add()
+
+            if epoch != self.epoch:
+                self._release()
+            elif next_stage:
+                await next_stage.queue.put((epoch, ctx))
+            else:
+                self.pending[ctx.block_number] = ctx
+                self._ready.set()
+
+    async def _commit_in_order(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self.error is None and self.committed + 1 in self.pending:
+                ctx = self.pending.pop(self.committed + 1)
+                epoch = self.epoch
+                try:
+                    await self.commit(ctx)
+                except Exception as e:
+                    # Later blocks must not be committed before this one
+                    self.logger.error(f"Failed to commit block {ctx.block_number} on {self.network}: {e}")
+                    if epoch != self.epoch:
+                        self._release()
+                        continue
+                    self.pending[ctx.block_number] = ctx
+                    await asyncio.sleep(1)
+                    self._ready.set()
+                    break
+
+                self._release()
+                if self.error is not None:
+                    break
+                if epoch == self.epoch:
+                    self.committed = ctx.block_number
+                    self.commits.add()
+                async with self._progress:
+                    self._progress.notify_all()
+
+    def summary(self) -> str:
+        stages = ", ".join(stage.summary() for stage in self.stages)
+        return (
+            f"{stages}, commit pending={len(self.pending)} {self.commits.rate():.1f}/s, "
+            f"in flight {self.in_flight}/{self.window_size}"
+        )
@@ -0,0 +1,76 @@
+from typing import Dict, Iterable, Optional
+from loguru import logger as global_logger
+
+from rpc import JsonRpcClient, RpcError
+
+
+BLOCK_RECEIPTS = "block_receipts"
+BATCH = "batch"
+AUTO = "auto"
+
+
+class ReceiptFetcher:
+    """Fetch all receipts of a block with as few round trips as possible.
+
+    ``eth_getBlockReceipts`` returns every receipt of a block in one call. Nodes
+    that do not implement it are served with JSON-RPC batches of
+    ``eth_getTransactionReceipt`` instead. In ``auto`` mode the first block
+    decides which method this network uses.
+    """
+
+    def __init__(self, client: JsonRpcClient, network: str, mode: str = AUTO, batch_size: int = 100, logger=None):
+        self.client = client
+        self.network = network
+        self.mode = mode
+        self.batch_size = batch_size
+        self.logger = logger or global_logger
+
+    async def _fetch_block_receipts(self, block_number: int) -> Optional[list]:
+        try:
+            return await self.client.call("eth_getBlockReceipts", [hex(block_number)])
+        except RpcError as e:
+            if self.mode == AUTO and e.is_method_unsupported:
+                self.logger.info(f"eth_getBlockReceipts unsupported on {self.network}, using batched receipts")
+                self.mode = BATCH
+                return None
+            raise
+
+    async def _fetch_batched(self, tx_hashes: Iterable[str]) -> list:
+        hashes = list(tx_hashes)
+        receipts = []
+        for i in range(0, len(hashes), self.batch_size):
+            chunk = hashes[i:i + self.batch_size]
+            results = await self.client.batch([("eth_getTransactionReceipt", [h]) for h in chunk])
+            for tx_hash, result in zip(chunk, results):
+                # A missing receipt would silently drop its contract; fail the block instead
+                if isinstance(result, RpcError):
+                    raise RpcError(result.code, f"receipt {tx_hash}: {result.message}")
+                if not result:
+                    raise RpcError(-32000, f"receipt {tx_hash} not available yet")
+                receipts.append(result)
+        return receipts
+
+    async def fetch(self, block_number: int, tx_hashes: Iterable[str]) -> Dict[str, dict]:
+        """Return receipts for ``block_number`` keyed by lower-case tx hash.
+
+        ``tx_hashes`` are the transactions of interest; block-receipts mode returns
+        the whole block regardless, batch mode only asks for these.
+        """
+        tx_hashes = list(tx_hashes)
+        if not tx_hashes:
+            return {}
+
+        round_trips = self.client.round_trips
+        receipts = None
+        if self.mode in (AUTO, BLOCK_RECEIPTS):
+            receipts = await self._fetch_block_receipts(block_number)
+            if receipts is not None and self.mode == AUTO:
+                self.mode = BLOCK_RECEIPTS
+        if receipts is None:
+            receipts = await self._fetch_batched(tx_hashes)
+
+        self.logger.debug(
+            f"Fetched {len(receipts)} receipts for block {block_number} on {self.network} "
+            f"in {self.client.round_trips - round_trips} round trip(s) ({self.mode})"
+        )
+        return {receipt['transactionHash'].lower(): receipt for receipt in receipts}
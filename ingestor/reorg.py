@@ -0,0 +1,59 @@
+from collections import deque
+from typing import Iterable, NamedTuple, Optional
+
+
+class BlockHeader(NamedTuple):
+    number: int
+    hash: str
+    parent_hash: str
+
+
+class ReorgTracker:
+    """Bounded ring buffer of recently processed headers of one network.
+
+    Each new header is checked against the buffered tip: a parent hash that
+    does not match means the chain reorganized below it. This only compares
+    hashes already returned by ``eth_getBlockByNumber``, so the common case
+    costs no extra RPC.
+    """
+
+    def __init__(self, network: str, size: int = 128):
+        self.network = network
+        self.headers = deque(maxlen=size)
+
+    @property
+    def tip(self) -> Optional[BlockHeader]:
+        return self.headers[-1] if self.headers else None
+
+    @property
+    def oldest(self) -> Optional[BlockHeader]:
+        return self.headers[0] if self.headers else None
+
+    def hash_at(self, number: int) -> Optional[str]:
+        for header in reversed(self.headers):
+            if header.number == number:
+                return header.hash
+            if header.number < number:
+                break
+        return None
+
+    def extend(self, headers: Iterable[Optional[BlockHeader]]) -> Optional[int]:
+        """Append headers in block order.
+
+        Returns the number of the first header whose parent is not the buffered
+        tip (a reorg), leaving it and everything after it out of the buffer. A
+        header that does not directly follow the tip cannot be checked and is
+        reported the same way; callers fill such gaps before extending.
+        """
+        for header in sorted((h for h in headers if h), key=lambda h: h.number):
+            tip = self.tip
+            if tip and (header.number > tip.number + 1
+                        or header.number == tip.number + 1 and header.parent_hash != tip.hash):
+                return header.number
+            self.headers.append(header)
+        return None
+
+    def rewind(self, number: int):
+        """Drop every header above ``number``"""
+        while self.headers and self.headers[-1].number > number:
+            self.headers.pop()
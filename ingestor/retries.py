@@ -0,0 +1,135 @@
+"""Persistent retry queue for blocks that failed processing.
+
+The live pipeline records a failed block in ``block_retries`` in the same
+transaction that moves the checkpoint past it (see ``TokenWriter``), so a
+temporary RPC failure no longer loses the block's tokens. ``BlockRetrier``
+polls the due entries of one network off the live path and runs them
+through the pipeline stages again: a success writes the tokens and removes
+the entry in one transaction, a failure pushes ``next_attempt_at`` back
+exponentially. After ``limit`` attempts the entry stays behind with
+``dead`` set, as a dead-letter record.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+from loguru import logger as global_logger
+from sqlalchemy import select, update
+
+from block_context import BlockContext
+from database import engine
+from metrics import current_rpc_counter
+from models import BlockRetry
+
+
+class BlockRetrier:
+    """Retry worker for the failed blocks of one network"""
+
+    def __init__(self, monitor, limit: int = 8, base_delay: float = 30.0, max_delay: float = 3600.0,
+                 poll_interval: float = 10.0, concurrency: int = 2, logger=None):
+        self.monitor = monitor
+        self.network = monitor.network
+        self.limit = limit
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        self.logger = logger or global_logger
+        self.recovered = 0
+        self.dead_lettered = 0
+
+    def next_attempt_at(self, attempts: int) -> datetime:
+        """When to try again after ``attempts`` failed attempts"""
+        delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    def due_blocks(self) -> List[int]:
+        with engine.connect() as conn:
+            return list(conn.execute(
+                select(BlockRetry.block_number)
+                .where(
+                    BlockRetry.network == self.network,
+                    BlockRetry.dead == False,
+                    BlockRetry.next_attempt_at <= datetime.utcnow()
+                )
+                .order_by(BlockRetry.block_number)
+                .limit(self.concurrency * 10)
+            ).scalars())
+
+    def record_failure(self, block_number: int, error: Exception) -> bool:
+        """Count a failed attempt; returns True if the block is now dead-lettered"""
+        with engine.begin() as conn:
+            attempts = conn.execute(
+                select(BlockRetry.attempts)
+                .where(BlockRetry.network == self.network, BlockRetry.block_number == block_number)
+                .with_for_update()
+            ).scalar()
+            if attempts is None:
+                # Removed meanwhile, e.g. by a reorg rollback
+                return False
+            attempts += 1
+            dead = attempts >= self.limit
+            conn.execute(
+                update(BlockRetry)
+                .where(BlockRetry.network == self.network, BlockRetry.block_number == block_number)
+                .values(
+                    attempts=attempts, dead=dead, next_attempt_at=self.next_attempt_at(attempts),
+                    last_error=f"{type(error).__name__}: {error}"[:1000]
+                )
+            )
+        return dead
+
+    async def run_stages(self, block_number: int) -> BlockContext:
+        """Run one block through every pipeline stage, raising if one fails"""
+        monitor = self.monitor
+        head = monitor.head_source.head or await monitor.w3.eth.block_number
+        ctx = BlockContext(self.network, block_number, None, head)
+        counter_token = current_rpc_counter.set(ctx.rpc)
+        try:
+            for stage in monitor.pipeline.stages:
+                await stage.handler(ctx)
+        finally:
+            current_rpc_counter.reset(counter_token)
+        return ctx
+
+    async def retry(self, block_number: int) -> bool:
+        """Run one block through every pipeline stage; returns True on success"""
+        monitor = self.monitor
+        try:
+            ctx = await self.run_stages(block_number)
+        except Exception as e:
+            if await asyncio.to_thread(self.record_failure, block_number, e):
+                self.dead_lettered += 1
+                self.logger.error(
+                    f"☠️ Giving up on block {block_number} on {self.network} after {self.limit} attempts: {e}"
+                )
+            else:
+                self.logger.warning(f"♻️ Retry of block {block_number} on {self.network} failed: {e}")
+            return False
+
+        await monitor.writer.add(ctx.token_rows)
+        await monitor.writer.resolve_retry(block_number)
+        self.recovered += 1
+        self.logger.success(
+            f"♻️ Recovered block {block_number} on {self.network} with {len(ctx.token_rows)} token(s)"
+        )
+        return True
+
+    async def run(self):
+        """Retry due blocks every ``poll_interval`` seconds, ``concurrency`` at a time"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(block_number: int):
+            async with semaphore:
+                return await self.retry(block_number)
+
+        while True:
+            try:
+                due = await asyncio.to_thread(self.due_blocks)
+                if due:
+                    await asyncio.gather(*(bounded(block_number) for block_number in due))
+                    # Write recovered tokens and clear their entries before the next poll
+                    await self.monitor.writer.flush()
+            except Exception as e:
+                self.logger.error(f"Block retry worker on {self.network} failed: {e}")
+            await asyncio.sleep(self.poll_interval)
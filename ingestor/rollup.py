@@ -0,0 +1,101 @@
+"""Maintenance of the token_stats_hourly rollup read by /stats/summary.
+
+Deltas are applied in the same transaction as the token writes that cause
+them. Run ``python rollup.py`` to rebuild the rollup from the tokens table.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from loguru import logger
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from config import get_settings
+from database import Base, engine
+from models import Token, TokenStatsHourly
+
+settings = get_settings()
+
+
+class RollupDeltas:
+    """Accumulated (count, confirmed_count, high_risk_count) changes per network and hour"""
+
+    def __init__(self):
+        self.deltas: Dict[Tuple[str, datetime], list] = defaultdict(lambda: [0, 0, 0])
+
+    @staticmethod
+    def hour_of(timestamp: datetime) -> datetime:
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+
+    def add_token(self, network: str, timestamp: datetime, confirmed: bool, risk_score: int, sign: int = 1):
+        delta = self.deltas[(network, self.hour_of(timestamp))]
+        delta[0] += sign
+        delta[1] += sign if confirmed else 0
+        delta[2] += sign if (risk_score or 0) >= settings.high_risk_score else 0
+
+    def add_confirmed(self, network: str, timestamps: Iterable[datetime]):
+        for timestamp in timestamps:
+            self.deltas[(network, self.hour_of(timestamp))][1] += 1
+
+    def apply(self, conn):
+        """Upsert the deltas into the rollup on ``conn``"""
+        # Rows are locked in VALUES order; a fixed (network, hour) order keeps concurrent
+        # writers (token writer, confirmation sweeper) from deadlocking on each other
+        rows = [
+            {'network': network, 'hour': hour, 'count': count,
+             'confirmed_count': confirmed, 'high_risk_count': high_risk}
+            for (network, hour), (count, confirmed, high_risk) in sorted(self.deltas.items())
+            if count or confirmed or high_risk
+        ]
+        if not rows:
+            return
+
+        stmt = insert(TokenStatsHourly).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TokenStatsHourly.network, TokenStatsHourly.hour],
+            set_={
+                'count': TokenStatsHourly.count + stmt.excluded.count,
+                'confirmed_count': TokenStatsHourly.confirmed_count + stmt.excluded.confirmed_count,
+                'high_risk_count': TokenStatsHourly.high_risk_count + stmt.excluded.high_risk_count,
+            }
+        )
+        conn.execute(stmt)
+
+
+def rebuild(conn):
+    """Recompute the whole rollup from the tokens table"""
+    # Block concurrent token writes so no delta is lost between the two statements
+    conn.execute(text("LOCK TABLE tokens IN SHARE MODE"))
+    conn.execute(TokenStatsHourly.__table__.delete())
+
+    hour = func.date_trunc(text("'hour'"), Token.timestamp)
+    conn.execute(
+        insert(TokenStatsHourly).from_select(
+            ['network', 'hour', 'count', 'confirmed_count', 'high_risk_count'],
+            select(
+                Token.network,
+                hour,
+                func.count(),
+                func.count().filter(Token.confirmed),
+                func.count().filter(Token.risk_score >= settings.high_risk_score)
+            ).group_by(Token.network, hour)
+        )
+    )
+
+
+def ensure_rollup():
+    """Build the rollup on first start against a database that already holds tokens"""
+    with engine.begin() as conn:
+        has_rollup = conn.execute(select(TokenStatsHourly.network).limit(1)).first()
+        has_tokens = conn.execute(select(Token.id).limit(1)).first()
+        if has_tokens and not has_rollup:
+            logger.info("📚 Building token_stats_hourly from existing tokens")
+            rebuild(conn)
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        rebuild(conn)
+    logger.success("📚 token_stats_hourly rebuilt")
@@ -0,0 +1,331 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Any, List, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+import aiohttp
+from loguru import logger as global_logger
+from web3._utils.encoding import Web3JsonEncoder
+from web3.providers.async_base import AsyncBaseProvider
+
+from metrics import record_rpc
+
+
+class RpcError(Exception):
+    """JSON-RPC error object returned by the node"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def is_method_unsupported(self) -> bool:
+        # -32601 is the spec code; some providers answer -32600/-32602 with a text hint
+        text = self.message.lower()
+        return self.code == -32601 or any(hint in text for hint in (
+            "not supported", "unsupported", "does not exist", "not whitelisted"
+        ))
+
+
+class RpcThrottled(Exception):
+    """HTTP 429 from an endpoint"""
+
+
+class RpcUnavailable(Exception):
+    """Every endpoint's circuit breaker is open"""
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float, now: float) -> float:
+        """Seconds until ``cost`` tokens are available"""
+        self._refill(now)
+        cost = min(cost, self.capacity)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def take(self, cost: float, now: float):
+        self._refill(now)
+        self.tokens -= min(cost, self.capacity)
+
+
+class RpcEndpoint:
+    """One node URL with its latency estimate, rate limit and circuit breaker.
+
+    After ``failure_threshold`` consecutive transport failures the breaker
+    opens and the endpoint gets no traffic for ``open_interval`` seconds
+    (doubling on every failed probe). Then a single probe request is let
+    through; success closes the breaker again. A 429 only pauses the
+    endpoint for its ``Retry-After``.
+    """
+
+    def __init__(self, url: str, weight: float = 1.0, rate_limit: float = 25.0, burst: Optional[float] = None,
+                 failure_threshold: int = 5, open_interval: float = 30.0):
+        self.url = url
+        self.weight = weight
+        self.bucket = TokenBucket(rate_limit, burst or max(1.0, rate_limit))
+        self.failure_threshold = failure_threshold
+        self.open_interval = open_interval
+
+        self.latency = 0.2  # seconds, EWMA; optimistic until measured
+        self.in_flight = 0
+        self.failures = 0
+        self.open_until = 0.0
+        self.throttled_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.throttles = 0
+
+    @property
+    def name(self) -> str:
+        return urlsplit(self.url).netloc or self.url
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if self.is_open(time.monotonic()) else "half-open"
+
+    def is_open(self, now: float) -> bool:
+        return self.failures >= self.failure_threshold and now < self.open_until
+
+    def available_at(self, cost: float, now: float) -> float:
+        """Earliest time this endpoint may take a request of ``cost``"""
+        if self.failures >= self.failure_threshold and self.in_flight:
+            # Half-open: one probe at a time
+            return now + self.latency
+        return max(now, self.throttled_until) + self.bucket.delay(cost, now)
+
+    def score(self) -> float:
+        """Expected wait for a new request; lower is better"""
+        return self.latency * (self.in_flight + 1) / self.weight
+
+    def record_success(self, seconds: float):
+        self.latency = 0.8 * self.latency + 0.2 * seconds
+        self.failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a transport failure; returns True when it opens the breaker"""
+        self.errors += 1
+        now = time.monotonic()
+        if self.failures >= self.failure_threshold and now < self.open_until:
+            # Requests sent before the breaker opened are still failing
+            return False
+        self.failures += 1
+        if self.failures < self.failure_threshold:
+            return False
+        backoff = 2 ** min(self.failures - self.failure_threshold, 5)
+        self.open_until = now + self.open_interval * backoff
+        return True
+
+    def record_throttle(self, retry_after: float):
+        self.throttles += 1
+        self.throttled_until = time.monotonic() + retry_after
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.latency * 1000:.0f}ms {self.state} "
+            f"req={self.requests} err={self.errors} 429={self.throttles}"
+        )
+
+
+def parse_endpoints(spec: str, rate_limit: float = 25.0, failure_threshold: int = 5,
+                    open_interval: float = 30.0) -> List[RpcEndpoint]:
+    """Build endpoints from ``url[|weight[|requests_per_second]]`` entries separated by commas"""
+    endpoints = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        url, *options = entry.split("|")
+        endpoints.append(RpcEndpoint(
+            url,
+            weight=float(options[0]) if len(options) > 0 else 1.0,
+            rate_limit=float(options[1]) if len(options) > 1 else rate_limit,
+            failure_threshold=failure_threshold,
+            open_interval=open_interval
+        ))
+    if not endpoints:
+        raise ValueError("No RPC endpoint configured")
+    return endpoints
+
+
+class JsonRpcClient:
+    """Async JSON-RPC client over a pool of endpoints, with batch support.
+
+    Every request goes to the available endpoint with the lowest
+    latency-times-load per weight, after taking its cost (1 per request, 1
+    per batch entry) from that endpoint's token bucket. Transport errors,
+    5xx and 429 answers are retried on another endpoint; JSON-RPC error
+    objects are returned to the caller as they are.
+    """
+
+    def __init__(self, endpoints: Union[str, Sequence[RpcEndpoint]], logger=None, timeout: float = 30,
+                 pool_size: int = 100, max_attempts: Optional[int] = None):
+        self.endpoints = parse_endpoints(endpoints) if isinstance(endpoints, str) else list(endpoints)
+        self.logger = logger or global_logger
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.pool_size = pool_size
+        self.max_attempts = max_attempts or max(3, len(self.endpoints) + 1)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.round_trips = 0
+        self._ids = itertools.count(1)
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            # One keep-alive pool shared by all endpoints of the network
+            self.session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60, ttl_dns_cache=300),
+                json_serialize=lambda obj: json.dumps(obj, cls=Web3JsonEncoder)
+            )
+        return self.session
+
+    async def _acquire(self, cost: float, exclude: Set[RpcEndpoint]) -> RpcEndpoint:
+        """Wait for an endpoint that can take ``cost`` now, preferring ones not in ``exclude``"""
+        while True:
+            now = time.monotonic()
+            closed = [e for e in self.endpoints if not e.is_open(now)]
+            if not closed:
+                # Fail fast instead of queueing every caller behind the breakers
+                raise RpcUnavailable(f"All RPC endpoints are ejected: {self.summary()}")
+            candidates = [e for e in closed if e not in exclude] or closed
+            ready = [e for e in candidates if e.available_at(cost, now) <= now]
+            if ready:
+                endpoint = min(ready, key=RpcEndpoint.score)
+                endpoint.bucket.take(cost, now)
+                endpoint.in_flight += 1
+                endpoint.requests += 1
+                return endpoint
+            wait = min(e.available_at(cost, now) for e in candidates) - now
+            await asyncio.sleep(min(max(wait, 0.01), 1.0))
+
+    @staticmethod
+    def _retry_after(response: aiohttp.ClientResponse) -> float:
+        try:
+            return max(0.0, float(response.headers.get("Retry-After", 1)))
+        except ValueError:
+            return 1.0
+
+    async def _post(self, payload: Any) -> Any:
+        if isinstance(payload, list):
+            record_rpc(f"batch[{payload[0]['method']}]")
+            cost = len(payload)
+        else:
+            record_rpc(payload['method'])
+            cost = 1
+
+        tried: Set[RpcEndpoint] = set()
+        last_error: Optional[Exception] = None
+        for _ in range(self.max_attempts):
+            endpoint = await self._acquire(cost, tried)
+            self.round_trips += 1
+            started = time.monotonic()
+            try:
+                async with self._session().post(endpoint.url, json=payload) as response:
+                    if response.status == 429:
+                        endpoint.record_throttle(self._retry_after(response))
+                        raise RpcThrottled(f"429 from {endpoint.name}")
+                    response.raise_for_status()
+                    result = await response.json(content_type=None)
+            except RpcThrottled as e:
+                last_error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                last_error = e
+                if endpoint.record_failure():
+                    self.logger.warning(f"⚡ RPC endpoint {endpoint.name} ejected for "
+                                        f"{endpoint.open_until - time.monotonic():.0f}s: {e!r}")
+            else:
+                endpoint.record_success(time.monotonic() - started)
+                return result
+            finally:
+                endpoint.in_flight -= 1
+            tried.add(endpoint)
+        raise last_error
+
+    @staticmethod
+    def _unwrap(response: dict) -> Any:
+        if response.get('error'):
+            error = response['error']
+            raise RpcError(error.get('code', 0), error.get('message', ''))
+        return response.get('result')
+
+    async def request(self, method: str, params: Optional[list] = None) -> dict:
+        """Send a single JSON-RPC request and return the whole response object"""
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        return await self._post(payload)
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        """Send a single JSON-RPC request and return its result"""
+        return self._unwrap(await self.request(method, params))
+
+    async def batch(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        """Send several requests in one HTTP round trip.
+
+        Results come back in the order of ``calls``; a failed entry is returned
+        as an ``RpcError`` instance instead of raising, so one bad call does not
+        discard the rest of the batch.
+        """
+        if not calls:
+            return []
+
+        payload = [
+            {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+            for method, params in calls
+        ]
+        response = await self._post(payload)
+
+        # A node that rejects batching answers with a single error object
+        if isinstance(response, dict):
+            self._unwrap(response)
+            raise RpcError(-32600, "Batch requests are not supported")
+
+        by_id = {item.get('id'): item for item in response}
+        results = []
+        for request in payload:
+            item = by_id.get(request['id'])
+            if item is None:
+                results.append(RpcError(-32603, "Missing response in batch"))
+                continue
+            try:
+                results.append(self._unwrap(item))
+            except RpcError as e:
+                results.append(e)
+        return results
+
+    def summary(self) -> str:
+        return "; ".join(endpoint.summary() for endpoint in self.endpoints)
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+
+class PooledProvider(AsyncBaseProvider):
+    """AsyncWeb3 provider that sends every request through a ``JsonRpcClient``"""
+
+    def __init__(self, client: JsonRpcClient):
+        super().__init__()
+        self.client = client
+
+    async def make_request(self, method, params) -> dict:
+        return await self.client.request(method, params)
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            response = await self.client.request("web3_clientVersion", [])
+        except Exception:
+            if show_traceback:
+                raise
+            return False
+        return "result" in response
@@ -0,0 +1,69 @@
+"""In-process JSON-RPC server standing in for a node in tests."""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from rpc import RpcError
+
+
+class StubNode:
+    """Answers JSON-RPC requests from ``handlers`` (method -> callable(params)).
+
+    ``latency`` delays every answer, ``http_errors`` is a queue of
+    ``(status, headers)`` answered instead of the next requests and
+    ``fail_status`` answers every request with that HTTP status. Each HTTP
+    request is recorded in ``requests`` as ``(arrival time, methods)``.
+    Unknown methods get ``-32601``; a handler may raise ``RpcError``.
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Callable]] = None, latency: float = 0.0):
+        self.handlers = {"eth_blockNumber": lambda params: "0x64", **(handlers or {})}
+        self.latency = latency
+        self.http_errors: List[Tuple[int, dict]] = []
+        self.fail_status: Optional[int] = None
+        self.requests: List[Tuple[float, List[str]]] = []
+        self.url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def methods(self) -> List[str]:
+        """Every method called, batch entries included, in arrival order"""
+        return [method for _, methods in self.requests for method in methods]
+
+    def _answer(self, call: dict) -> dict:
+        handler = self.handlers.get(call["method"])
+        try:
+            if handler is None:
+                raise RpcError(-32601, f"the method {call['method']} does not exist/is not available")
+            return {"jsonrpc": "2.0", "id": call["id"], "result": handler(call.get("params", []))}
+        except RpcError as e:
+            return {"jsonrpc": "2.0", "id": call["id"], "error": {"code": e.code, "message": e.message}}
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        calls = body if isinstance(body, list) else [body]
+        self.requests.append((time.monotonic(), [call["method"] for call in calls]))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.http_errors:
+            status, headers = self.http_errors.pop(0)
+            return web.Response(status=status, headers=headers)
+        if self.fail_status:
+            return web.Response(status=self.fail_status)
+        answers = [self._answer(call) for call in calls]
+        return web.json_response(answers if isinstance(body, list) else answers[0])
+
+    async def __aenter__(self) -> "StubNode":
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", 0).start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}/"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
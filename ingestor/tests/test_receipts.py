@@ -0,0 +1,60 @@
+import asyncio
+
+from receipts import AUTO, BATCH, BLOCK_RECEIPTS, ReceiptFetcher
+from rpc import JsonRpcClient
+from tests.stub_node import StubNode
+
+TX_HASHES = [f"0x{i:064x}" for i in range(1, 6)]
+
+
+def receipt(tx_hash):
+    return {"transactionHash": tx_hash.upper().replace("0X", "0x"), "status": "0x1"}
+
+
+def block_receipts(params):
+    return [receipt(tx_hash) for tx_hash in TX_HASHES]
+
+
+def transaction_receipt(params):
+    return receipt(params[0])
+
+
+def fetch_blocks(handlers, mode, blocks=3, batch_size=100):
+    async def scenario():
+        async with StubNode(handlers) as node:
+            client = JsonRpcClient(node.url)
+            fetcher = ReceiptFetcher(client, "TEST", mode=mode, batch_size=batch_size)
+            try:
+                results = [await fetcher.fetch(number, TX_HASHES) for number in range(100, 100 + blocks)]
+            finally:
+                await client.close()
+            return fetcher, node, results
+
+    return asyncio.run(scenario())
+
+
+def test_block_receipts_is_one_call_per_block():
+    fetcher, node, results = fetch_blocks(
+        {"eth_getBlockReceipts": block_receipts, "eth_getTransactionReceipt": transaction_receipt}, AUTO
+    )
+    assert fetcher.mode == BLOCK_RECEIPTS
+    assert [methods for _, methods in node.requests] == [["eth_getBlockReceipts"]] * 3
+    assert all(sorted(result) == TX_HASHES for result in results)
+
+
+def test_unsupported_block_receipts_switches_to_batch_for_good():
+    fetcher, node, results = fetch_blocks({"eth_getTransactionReceipt": transaction_receipt}, AUTO)
+    assert fetcher.mode == BATCH
+    # The -32601 is asked once; every block after that is a single batch
+    assert [methods for _, methods in node.requests] == (
+        [["eth_getBlockReceipts"]] + [["eth_getTransactionReceipt"] * len(TX_HASHES)] * 3
+    )
+    assert all(sorted(result) == TX_HASHES for result in results)
+
+
+def test_batch_mode_chunks_by_batch_size():
+    fetcher, node, results = fetch_blocks({"eth_getTransactionReceipt": transaction_receipt}, BATCH,
+                                          blocks=1, batch_size=2)
+    assert [len(methods) for _, methods in node.requests] == [2, 2, 1]
+    assert "eth_getBlockReceipts" not in node.methods
+    assert sorted(results[0]) == TX_HASHES
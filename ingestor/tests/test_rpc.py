@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import pytest
+
+from rpc import JsonRpcClient, RpcError, RpcUnavailable, parse_endpoints
+from tests.stub_node import StubNode
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_throttled_endpoint_backs_off_and_fails_over():
+    async def scenario():
+        async with StubNode() as preferred, StubNode() as fallback:
+            preferred.http_errors.append((429, {"Retry-After": "2"}))
+            client = JsonRpcClient(parse_endpoints(f"{preferred.url}|10,{fallback.url}|1"))
+            try:
+                assert await client.call("eth_blockNumber") == "0x64"
+                throttled = client.endpoints[0]
+                assert throttled.throttles == 1
+                assert throttled.throttled_until - time.monotonic() > 1.5
+
+                # Still paused: the preferred endpoint gets nothing until Retry-After passes
+                for _ in range(3):
+                    await client.call("eth_blockNumber")
+                assert len(preferred.requests) == 1
+                assert len(fallback.requests) == 4
+            finally:
+                await client.close()
+
+    run(scenario())
+
+
+def test_breaker_ejects_endpoint_and_probes_it_once_when_half_open():
+    async def scenario():
+        async with StubNode(latency=0.2) as flaky, StubNode(latency=0.02) as healthy:
+            flaky.fail_status = 503
+            client = JsonRpcClient(parse_endpoints(
+                f"{flaky.url}|100,{healthy.url}|0.01", failure_threshold=2, open_interval=0.5
+            ))
+            try:
+                for _ in range(4):
+                    assert await client.call("eth_blockNumber") == "0x64"
+                # Ejected after two failures; later calls go straight to the healthy endpoint
+                assert len(flaky.requests) == 2
+                assert client.endpoints[0].state == "open"
+
+                flaky.fail_status = None
+                await asyncio.sleep(0.55)
+                assert client.endpoints[0].state == "half-open"
+
+                # One probe at a time: concurrent calls meanwhile use the other endpoint
+                results = await asyncio.gather(*(client.call("eth_blockNumber") for _ in range(3)))
+                assert results == ["0x64"] * 3
+                assert len(flaky.requests) == 3
+                assert client.endpoints[0].state == "closed"
+            finally:
+                await client.close()
+
+    run(scenario())
+
+
+def test_all_endpoints_ejected_fails_fast():
+    async def scenario():
+        async with StubNode() as node:
+            node.fail_status = 503
+            client = JsonRpcClient(parse_endpoints(node.url, failure_threshold=2, open_interval=30))
+            try:
+                with pytest.raises(RpcUnavailable):
+                    await client.call("eth_blockNumber")
+                started = time.monotonic()
+                with pytest.raises(RpcUnavailable):
+                    await client.call("eth_blockNumber")
+                assert time.monotonic() - started < 0.1
+                assert len(node.requests) == 2
+            finally:
+                await client.close()
+
+    run(scenario())
+
+
+def test_token_bucket_paces_requests():
+    async def scenario():
+        async with StubNode() as node:
+            # 20 requests/s with a burst of 20: 40 calls need about one second
+            client = JsonRpcClient(parse_endpoints(f"{node.url}|1|20"))
+            try:
+                started = time.monotonic()
+                await asyncio.gather(*(client.call("eth_blockNumber") for _ in range(40)))
+                elapsed = time.monotonic() - started
+            finally:
+                await client.close()
+            assert 0.9 <= elapsed < 2.0
+            arrivals = [arrived - started for arrived, _ in node.requests]
+            assert sum(1 for arrived in arrivals if arrived < 0.5) <= 30
+
+    run(scenario())
+
+
+def test_least_latency_per_weight_picks_expected_endpoint():
+    async def scenario():
+        async with StubNode(latency=0.1) as slow, StubNode(latency=0.005) as fast:
+            client = JsonRpcClient(parse_endpoints(f"{slow.url},{fast.url}", rate_limit=1000))
+            try:
+                # Two concurrent calls measure both endpoints
+                await asyncio.gather(client.call("eth_blockNumber"), client.call("eth_blockNumber"))
+                assert len(slow.requests) == len(fast.requests) == 1
+                for _ in range(10):
+                    await client.call("eth_blockNumber")
+                assert len(slow.requests) == 1
+                assert len(fast.requests) == 11
+            finally:
+                await client.close()
+
+        async with StubNode(latency=0.02) as heavy, StubNode(latency=0.02) as light:
+            client = JsonRpcClient(parse_endpoints(f"{light.url}|1,{heavy.url}|4", rate_limit=1000))
+            try:
+                for _ in range(5):
+                    await client.call("eth_blockNumber")
+                # Equal latency: the higher weight wins
+                assert len(heavy.requests) == 5
+                assert not light.requests
+            finally:
+                await client.close()
+
+    run(scenario())
+
+
+def test_rpc_error_object_is_not_retried():
+    async def scenario():
+        async with StubNode() as first, StubNode() as second:
+            client = JsonRpcClient(parse_endpoints(f"{first.url}|10,{second.url}|1"))
+            try:
+                with pytest.raises(RpcError) as error:
+                    await client.call("eth_getBlockReceipts", ["0x1"])
+                assert error.value.is_method_unsupported
+                assert len(first.requests) + len(second.requests) == 1
+            finally:
+                await client.close()
+
+    run(scenario())